@@ -0,0 +1,139 @@
+import os
+import sys
+import copy
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+from MemoryStreamStore import MemoryStreamStore
+
+# Agents kept loaded per pool (per worker process) unless configured otherwise
+DEFAULT_CAPACITY = 8
+
+
+def generative_agent_class():
+    """genagents' GenerativeAgent, imported on first use (from GENAGENTS_PATH when genagents is not installed)."""
+    genagents_path = os.environ.get("GENAGENTS_PATH")
+    if genagents_path and genagents_path not in sys.path:
+        sys.path.append(genagents_path)
+    from genagents import GenerativeAgent
+    return GenerativeAgent
+
+
+class PooledAgent:
+    """
+    A loaded agent with its memory stream store, the nodes.json version it was loaded from and a
+    copy of its in-memory stream as loaded, which reset() restores.
+    """
+
+    def __init__(self, agent_id: str, agent_folder: str, genagent, store: MemoryStreamStore):
+        self.agent_id = agent_id
+        self.agent_folder = agent_folder
+        self.genagent = genagent
+        self.store = store
+        self.version = _nodes_version(store)
+        stream = genagent.memory_stream
+        self._nodes = copy.deepcopy(stream.seq_nodes)
+        self._embedded = set(getattr(stream, "embeddings", None) or ())
+
+    def reset(self):
+        """
+        Restores the in-memory stream to its on-disk state: drops nodes remembered since loading and
+        undoes retrieval updates (e.g. last_retrieved), without reloading the agent or its embeddings.
+        """
+        stream = self.genagent.memory_stream
+        stream.seq_nodes[:] = copy.deepcopy(self._nodes)
+        stream.id_to_node.clear()
+        stream.id_to_node.update({node.node_id: node for node in stream.seq_nodes})
+        embeddings = getattr(stream, "embeddings", None)
+        if embeddings:
+            for content in [c for c in embeddings if c not in self._embedded]:
+                del embeddings[content]
+
+
+def _nodes_version(store: MemoryStreamStore):
+    return os.stat(store.nodes_path).st_mtime_ns if os.path.exists(store.nodes_path) else None
+
+
+class AgentPool:
+    """
+    Bounded LRU of loaded agents keyed by agent id.
+
+    An agent is loaded with agent_factory(agent_folder=...) (GenerativeAgent by default) on first
+    use, after its pending memory stream log has been folded into nodes.json so the load sees every
+    node. Once more than `capacity` agents are loaded the least recently used one is evicted and the
+    nodes pending in its memory stream log (e.g. trait adjustments) are flushed into nodes.json.
+    A pooled agent whose nodes.json changed on disk since it was loaded (e.g. by the mutation phase)
+    is reloaded on its next use.
+
+    Every get() hands out the agent as it is on disk. What it remembered in memory while playing
+    (per-turn observations, match summaries) is discarded by reset() before it is handed out again,
+    and never written to disk. A match therefore depends only on the agent's genome (its files on
+    disk) and the match settings, never on pool capacity, grouping or which worker played it, which
+    is what FitnessCache's genome-keyed results assume.
+    """
+
+    def __init__(self, population_dir: str, capacity: int = DEFAULT_CAPACITY,
+                 agent_factory: Optional[Callable] = None):
+        self.population_dir = population_dir
+        self.capacity = max(1, capacity)
+        self.agent_factory = agent_factory
+        self._agents: "OrderedDict[str, PooledAgent]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def agent_folder(self, agent_id: str) -> str:
+        return os.path.join(self.population_dir, agent_id)
+
+    def _load(self, agent_id: str) -> PooledAgent:
+        agent_folder = self.agent_folder(agent_id)
+        store = MemoryStreamStore.for_agent(agent_folder, compact_every=50)
+        if store.pending:
+            store.compact()
+        agent_factory = self.agent_factory or generative_agent_class()
+        return PooledAgent(agent_id, agent_folder, agent_factory(agent_folder=agent_folder), store)
+
+    def get(self, agent_id: str) -> PooledAgent:
+        """The pooled agent reset to its on-disk state, loading it (and evicting the coldest agent if full) on a miss."""
+        with self._lock:
+            entry = self._agents.get(agent_id)
+            if entry is not None and entry.version == _nodes_version(entry.store):
+                self.hits += 1
+                self._agents.move_to_end(agent_id)
+                entry.reset()
+                return entry
+            if entry is not None:
+                logging.info(f"Reloading agent {agent_id}: its memory stream changed on disk")
+                self._agents.pop(agent_id)
+            self.misses += 1
+            entry = self._load(agent_id)
+            self._agents[agent_id] = entry
+            while len(self._agents) > self.capacity:
+                self.evict(next(iter(self._agents)))
+            return entry
+
+    def evict(self, agent_id: str):
+        """Drops an agent from the pool, flushing its memory stream log into nodes.json."""
+        with self._lock:
+            entry = self._agents.pop(agent_id, None)
+            if entry is None:
+                return
+            self.evictions += 1
+            if entry.store.pending:
+                entry.store.compact()
+
+    def clear(self):
+        with self._lock:
+            for agent_id in list(self._agents):
+                self.evict(agent_id)
+
+    def __contains__(self, agent_id: str) -> bool:
+        return agent_id in self._agents
+
+    def __len__(self):
+        return len(self._agents)
+
+    def stats(self) -> dict:
+        return {"loaded": len(self._agents), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
@@ -0,0 +1,244 @@
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+import collections.abc
+from types import SimpleNamespace
+from typing import Callable, Dict, Optional, Union, get_args, get_origin
+
+TRAITS = [
+    "Nice: increase cooperation on the first move to invite mutual cooperation",
+    "Retaliatory: defect immediately after an opponent defection to punish exploitation",
+    "Forgiving: return to cooperation after one round of punishment to restore trust",
+    "Clear: keep a consistent, predictable response pattern so opponents learn to cooperate",
+    "Nice: decrease unconditional cooperation against opponents who keep defecting",
+    "Retaliatory: decrease punishment length to avoid long defection spirals",
+]
+
+CannedResponse = Union[dict, Callable[[list], dict]]
+
+
+class FakeRateLimitError(Exception):
+    """Injected rate-limit failure; looks like an HTTP 429 to is_retryable()."""
+    status_code = 429
+
+
+def _prompt_text(messages) -> str:
+    return "\n".join(m.get("content", "") for m in messages if isinstance(m, dict))
+
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeLLM:
+    """
+    Deterministic local stand-in for the instructor-patched OpenAI client.
+
+    Responses, injected errors and latency depend only on the seed, the request and how many times
+    that same request was made before, so runs are reproducible and a retried request can succeed.
+    Structured calls return the response_model filled from `canned` (keyed by model class name) or
+    synthesised from its fields; Iterable[...] response models stream items. Latency is a fixed
+    time to first token plus latency_per_token for every completion token, paid item by item when
+    streaming.
+    """
+
+    def __init__(self, latency: float = 0.0, latency_jitter: float = 0.0, latency_per_token: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 0, canned: Optional[Dict[str, CannedResponse]] = None,
+                 answer_chars: int = 300):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.latency_per_token = latency_per_token
+        self.error_rate = error_rate
+        self.seed = seed
+        self.canned = dict(canned or {})
+        self.answer_chars = answer_chars
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._seen = collections.Counter()
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _rng(self, model, messages) -> random.Random:
+        request = json.dumps([model, messages], sort_keys=True, default=str)
+        with self._lock:
+            occurrence = self._seen[request]
+            self._seen[request] += 1
+        digest = hashlib.sha256(f"{self.seed}:{occurrence}:{request}".encode("utf-8")).hexdigest()
+        return random.Random(int(digest[:16], 16))
+
+    def _answer(self, rng: random.Random, label: str) -> str:
+        words = ["I", "grew", "up", "near", "the", "river", "and", "my", "family", "always", "valued", "hard", "work",
+                 "honesty", "community", "so", "I", "try", "to", "be", "fair", "with", "people"]
+        text = f"({label}) "
+        while len(text) < self.answer_chars:
+            text += rng.choice(words) + " "
+        return text.strip() + "."
+
+    def _structured(self, response_model, rng: random.Random, messages) -> dict:
+        canned = self.canned.get(response_model.__name__)
+        if canned is not None:
+            return canned(messages) if callable(canned) else dict(canned)
+        if response_model.__name__ == "TraitAdjustment":
+            return {"node_id": 0, "content": rng.choice(TRAITS), "created": 0, "last_retrieved": 0, "pointer_id": None}
+        data = {}
+        for name, field in response_model.model_fields.items():
+            if not field.is_required():
+                continue
+            annotation = field.annotation
+            if annotation is type(None):
+                data[name] = None
+            elif annotation is int:
+                data[name] = rng.randint(0, 100)
+            elif annotation is float:
+                data[name] = rng.random()
+            elif annotation is bool:
+                data[name] = rng.random() < 0.5
+            else:
+                data[name] = self._answer(rng, name)
+        return data
+
+    def _items(self, item_model, rng: random.Random, messages):
+        if "question_number" in item_model.model_fields:
+            numbers = [int(n) for n in re.findall(r"^Question (\d+):", _prompt_text(messages), flags=re.MULTILINE)]
+            return [item_model(question_number=n, answer=self._answer(rng, f"question {n}")) for n in numbers]
+        return [item_model.model_validate(self._structured(item_model, rng, messages)) for _ in range(3)]
+
+    def _generate(self, tokens: int):
+        if self.latency_per_token:
+            time.sleep(self.latency_per_token * tokens)
+
+    def _stream(self, items):
+        for item in items:
+            self._generate(_count_tokens(item.model_dump_json()))
+            yield item
+
+    def create(self, model: str = "fake", messages=None, response_model=None, stream: bool = False, **kwargs):
+        """Drop-in for client.chat.completions.create(...)."""
+        messages = messages or []
+        rng = self._rng(model, messages)
+        if self.latency or self.latency_jitter:
+            time.sleep(self.latency + rng.uniform(0, self.latency_jitter))
+        if rng.random() < self.error_rate:
+            with self._lock:
+                self.calls += 1
+                self.errors += 1
+            raise FakeRateLimitError("Rate limit reached (fake 429)")
+
+        prompt = _prompt_text(messages)
+        if response_model is None:
+            interview_questions = prompt.count("Interviewer:")
+            if interview_questions:
+                content = "\n\n".join(self._answer(rng, f"answer {i + 1}") for i in range(interview_questions))
+            else:
+                content = self._answer(rng, "reply")
+            result, completion_text = None, content
+        elif get_origin(response_model) is collections.abc.Iterable:
+            result = self._items(get_args(response_model)[0], rng, messages)
+            completion_text = json.dumps([item.model_dump() for item in result])
+        else:
+            result = response_model.model_validate(self._structured(response_model, rng, messages))
+            completion_text = result.model_dump_json()
+
+        usage = SimpleNamespace(prompt_tokens=_count_tokens(prompt), completion_tokens=_count_tokens(completion_text))
+        usage.total_tokens = usage.prompt_tokens + usage.completion_tokens
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += usage.prompt_tokens
+            self.completion_tokens += usage.completion_tokens
+        raw = SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=completion_text))],
+            usage=usage,
+        )
+
+        if result is None:
+            self._generate(usage.completion_tokens)
+            return raw
+        if isinstance(result, list):
+            if stream:
+                return self._stream(result)
+            self._generate(usage.completion_tokens)
+            return result
+        self._generate(usage.completion_tokens)
+        # instructor attaches the raw completion to structured responses the same way
+        try:
+            result._raw_response = raw
+        except Exception:
+            pass
+        return iter([result]) if stream else result
+
+
+class FakeGenerativeAgent:
+    """
+    Offline stand-in for genagents' GenerativeAgent with the same memory_stream shape
+    (seq_nodes, id_to_node, embeddings). categorical_resp costs `latency` plus `per_node_latency`
+    per node in the stream, mimicking retrieval cost, and answers deterministically.
+    """
+
+    def __init__(self, agent_folder: Optional[str] = None, latency: float = 0.0, per_node_latency: float = 0.0,
+                 cooperation_bias: float = 0.7, seed: int = 0):
+        self.agent_folder = agent_folder
+        self.latency = latency
+        self.per_node_latency = per_node_latency
+        self.cooperation_bias = cooperation_bias
+        self.seed = seed
+        self.memory_stream = SimpleNamespace(seq_nodes=[], id_to_node={}, embeddings={})
+        nodes_path = os.path.join(agent_folder, "memory_stream", "nodes.json") if agent_folder else None
+        if nodes_path and os.path.exists(nodes_path):
+            with open(nodes_path, "r") as f:
+                for node in json.load(f):
+                    self._add(SimpleNamespace(**node))
+
+    def _add(self, node):
+        self.memory_stream.seq_nodes.append(node)
+        self.memory_stream.id_to_node[node.node_id] = node
+        self.memory_stream.embeddings[node.content] = [0.0]
+
+    def remember(self, content: str, time_step: int = 0):
+        node = SimpleNamespace(node_id=len(self.memory_stream.seq_nodes), node_type="observation", content=content,
+                               importance=50, created=time_step, last_retrieved=time_step, pointer_id=None)
+        self._add(node)
+
+    def categorical_resp(self, questions: dict) -> dict:
+        stream_size = len(self.memory_stream.seq_nodes)
+        delay = self.latency + self.per_node_latency * stream_size
+        if delay:
+            time.sleep(delay)
+        traits = "".join(n.content for n in self.memory_stream.seq_nodes if n.node_type == "trait_adjustment")
+        responses, reasonings = [], []
+        for question, options in questions.items():
+            digest = hashlib.sha256(f"{self.seed}:{traits}:{question}".encode("utf-8")).hexdigest()
+            cooperate = int(digest[:8], 16) / 0xFFFFFFFF < self.cooperation_bias
+            responses.append(options[0] if cooperate else options[-1])
+            reasonings.append(f"Fake reasoning over {stream_size} memories.")
+        return {"responses": responses, "reasonings": reasonings}
+
+
+def synthetic_population(agents: int, questions: int = 113, answer_chars: int = 400) -> dict:
+    """Memory streams of `agents` interviewed agents (agent-0000, ...), each answering `questions` questions."""
+    question_texts = [f"Interview question number {q}: tell me about this part of your life in detail." for q in range(questions)]
+    return {
+        f"agent-{a:04d}": [
+            {"node_id": q, "node_type": "observation",
+             "content": f"Interviewer: {question_texts[q]}\n\n" + (f"Agent {a} answer {q}. " * answer_chars)[:answer_chars],
+             "importance": 80, "created": 0, "last_retrieved": 0, "pointer_id": None}
+            for q in range(questions)
+        ]
+        for a in range(agents)
+    }
+
+
+def write_population(population_dir: str, agents: int, **kwargs) -> list:
+    """Writes a synthetic_population as agent folders under population_dir and returns the agent ids."""
+    population = synthetic_population(agents, **kwargs)
+    for agent_id, nodes in population.items():
+        os.makedirs(os.path.join(population_dir, agent_id, "memory_stream"))
+        with open(os.path.join(population_dir, agent_id, "memory_stream", "nodes.json"), 'w') as f:
+            json.dump(nodes, f, indent=2)
+    return sorted(population)
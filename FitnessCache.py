@@ -0,0 +1,88 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import List, Optional
+
+from FitnessEvaluator import MatchResult
+
+NO_SEED = -1  # sqlite primary keys treat NULLs as distinct, so unseeded matches are stored under this value
+
+
+class FitnessCache:
+    """
+    Persistent store of match results keyed by (genome hash, opponent, turns, seed, noise, config),
+    where config is FitnessEvaluator.player_config(): the player settings (agent class, LLM backend,
+    in-match compaction) that change how the same genome plays.
+
+    The genome hash covers every node of the agent's memory stream, so appending a mutation node
+    gives the agent a new key and its old results simply stop matching; no explicit invalidation
+    is needed. Old rows are kept for lineage analysis.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS matches ("
+            "genome TEXT NOT NULL, opponent TEXT NOT NULL, turns INTEGER NOT NULL, seed INTEGER NOT NULL, "
+            "noise REAL NOT NULL, config TEXT NOT NULL, agent_id TEXT NOT NULL, generation INTEGER, score REAL NOT NULL, "
+            "opponent_score REAL NOT NULL, elapsed REAL, created REAL NOT NULL, "
+            "PRIMARY KEY (genome, opponent, turns, seed, noise, config))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS matches_agent ON matches (agent_id)")
+        self._conn.commit()
+
+    @staticmethod
+    def _seed(seed: Optional[int]) -> int:
+        return NO_SEED if seed is None else seed
+
+    def get(self, genome: str, opponent: str, turns: int, seed: Optional[int], noise: float,
+            config: str = "") -> Optional[MatchResult]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT agent_id, score, opponent_score, elapsed FROM matches "
+                "WHERE genome = ? AND opponent = ? AND turns = ? AND seed = ? AND noise = ? AND config = ?",
+                (genome, opponent, turns, self._seed(seed), noise, config)
+            ).fetchone()
+        if row is None:
+            return None
+        agent_id, score, opponent_score, elapsed = row
+        return MatchResult(agent_id=agent_id, opponent=opponent, turns=turns, seed=seed, noise=noise,
+                           score=score, opponent_score=opponent_score, elapsed=elapsed or 0.0)
+
+    def put(self, genome: str, result: MatchResult, generation: Optional[int] = None, config: str = ""):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO matches VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (genome, result.opponent, result.turns, self._seed(result.seed), result.noise, config, result.agent_id,
+                 generation, result.score, result.opponent_score, result.elapsed, time.time())
+            )
+            self._conn.commit()
+
+    # --- Lineage queries ---
+    def _rows(self, where: str, args: tuple) -> List[dict]:
+        with self._lock:
+            cursor = self._conn.execute(f"SELECT * FROM matches WHERE {where} ORDER BY created", args)
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def results_for_genome(self, genome: str) -> List[dict]:
+        return self._rows("genome = ?", (genome,))
+
+    def results_for_agent(self, agent_id: str) -> List[dict]:
+        """Every result an agent ever produced, across all the genomes it went through."""
+        return self._rows("agent_id = ?", (agent_id,))
+
+    def fitness(self, genome: str) -> Optional[float]:
+        """Average score per match over every cached result for a genome."""
+        with self._lock:
+            row = self._conn.execute("SELECT AVG(score) FROM matches WHERE genome = ?", (genome,)).fetchone()
+        return row[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,336 @@
+import os
+import time
+import logging
+import multiprocessing
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pydantic import BaseModel
+from typing import Dict, List, Optional, Tuple, Union
+from AgentPool import AgentPool, DEFAULT_CAPACITY
+from Genome import genome_hash
+from LLMCache import make_key
+import LLMBackend
+from MemoryCompaction import MemoryCompactor
+import Tracing
+
+# --- Configuration ---
+# Deterministic classics from axelrod's library; entries may also be {"name": ..., "params": {...}}
+DEFAULT_OPPONENTS = ["TitForTat", "Cooperator", "Defector", "Grudger", "TitFor2Tats", "SuspiciousTitForTat"]
+
+OpponentSpec = Union[str, dict]
+
+
+class MatchResult(BaseModel):
+    agent_id: str
+    opponent: str
+    turns: int
+    seed: Optional[int] = None
+    noise: float = 0.0
+    score: float
+    opponent_score: float
+    elapsed: float
+
+
+class GenerationResult(BaseModel):
+    generation: int
+    fitness: Dict[str, float]
+    matches: List[MatchResult]
+    cached_matches: int = 0
+    wall_time: float
+    matches_per_second: float
+
+
+def list_agents(population_dir: str) -> List[str]:
+    """Ids of the agent folders (as written by InitialPopulation) in a population directory."""
+    return sorted(
+        name for name in os.listdir(population_dir)
+        if os.path.exists(os.path.join(population_dir, name, "memory_stream", "nodes.json"))
+    )
+
+
+def opponent_name(spec: OpponentSpec) -> str:
+    """Canonical label for an opponent spec, e.g. 'TitForTat' or 'GoByMajority(memory_depth=10)'."""
+    if isinstance(spec, str):
+        return spec
+    params = ", ".join(f"{k}={v!r}" for k, v in sorted(spec.get("params", {}).items()))
+    return f"{spec['name']}({params})" if params else spec["name"]
+
+
+def make_opponent(spec: OpponentSpec):
+    import axelrod as axl
+    if isinstance(spec, str):
+        return getattr(axl, spec)()
+    return getattr(axl, spec["name"])(**spec.get("params", {}))
+
+
+def describe_factory(agent_factory) -> str:
+    """Stable description of an agent factory (class and bound arguments) for cache keys."""
+    if agent_factory is None:
+        return "GenerativeAgent"
+    if isinstance(agent_factory, partial):
+        return f"{describe_factory(agent_factory.func)}({sorted(agent_factory.keywords.items())!r})"
+    return getattr(agent_factory, "__qualname__", repr(agent_factory))
+
+
+# ========== Worker ==========
+# Each worker process keeps a bounded LRU pool of the agents it plays; see AgentPool.
+_worker_config = {}
+
+
+def preload_match_modules():
+    """
+    Imports axelrod (tens of seconds cold), GenAgentPlayer and the LLM client's modules. Called in the
+    parent before the pool forks, so workers inherit them, and in each worker, so a spawned worker
+    pays at startup rather than in its first match.
+    """
+    import axelrod  # noqa: F401
+    from GenAgentMutation import GenAgentPlayer  # noqa: F401
+    LLMBackend.preload()
+
+
+def _mp_context():
+    # Importing axelrod switches the default start method to spawn, which re-imports everything in
+    # every worker; fork (where available) lets workers inherit the parent's modules
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+
+def _init_worker(population_dir: str, agent_factory=None, pool_size: int = DEFAULT_CAPACITY,
+                 compact_every: Optional[int] = None, policy_k: Optional[int] = None):
+    Tracing.configure_from_env()
+    preload_match_modules()
+    # A forked worker inherits the parent's client (and, with an LLM cache, its sqlite connection);
+    # drop it so the worker builds its own on first use
+    LLMBackend.set_client(None)
+    _worker_config["population_dir"] = population_dir
+    _worker_config["pool"] = AgentPool(population_dir, capacity=pool_size, agent_factory=agent_factory)
+    _worker_config["compactor"] = MemoryCompactor(every=compact_every) if compact_every else None
+    _worker_config["policy_k"] = policy_k
+    _worker_config["policy_tables"] = {}
+
+
+def _policy_table(agent_id: str):
+    """The worker's policy table for the agent's genome, distilled by the first match that needs it."""
+    from GenAgentMutation import GenAgentPlayer
+    genome = genome_hash(os.path.join(_worker_config["population_dir"], agent_id))
+    tables = _worker_config["policy_tables"]
+    if genome not in tables:
+        player = GenAgentPlayer(agent_id=agent_id, pool=_worker_config["pool"])
+        tables[genome] = player.distill_policy(_worker_config["policy_k"])
+    return tables[genome]
+
+
+def play_match(agent_id: str, opponent: OpponentSpec, turns: int, seed: Optional[int] = None,
+               noise: float = 0.0, parent_span: Optional[str] = None) -> MatchResult:
+    """Plays one match of an agent from the worker's population against an axelrod opponent."""
+    import axelrod as axl
+    from GenAgentMutation import GenAgentPlayer
+
+    start = time.perf_counter()
+    with Tracing.span("match", parent_id=parent_span, agent_id=agent_id, opponent=opponent_name(opponent), turns=turns) as span:
+        # Passed to the constructor: axelrod re-runs it with the same arguments when the match resets the player
+        policy_table = _policy_table(agent_id) if _worker_config.get("policy_k") else None
+        player = GenAgentPlayer(agent_id=agent_id, pool=_worker_config["pool"], compactor=_worker_config.get("compactor"),
+                                policy_table=policy_table)
+        match = axl.Match(players=[player, make_opponent(opponent)], turns=turns, seed=seed, noise=noise)
+        match.play()
+        span.set(nodes=len(player.genagent.memory_stream.seq_nodes))
+        if player.memory_store.pending:
+            player.memory_store.compact()
+        score, opponent_score = match.final_score()
+    return MatchResult(
+        agent_id=agent_id,
+        opponent=opponent_name(opponent),
+        turns=turns,
+        seed=seed,
+        noise=noise,
+        score=score,
+        opponent_score=opponent_score,
+        elapsed=time.perf_counter() - start,
+    )
+
+
+def play_matches(tasks: List[dict], parent_span: Optional[str] = None) -> List[Tuple[dict, Optional[MatchResult], Optional[str]]]:
+    """Plays a group of one agent's matches in order; returns (task, result, error) for each."""
+    outcomes = []
+    for task in tasks:
+        try:
+            outcomes.append((task, play_match(**task, parent_span=parent_span), None))
+        except Exception as e:
+            outcomes.append((task, None, str(e)))
+    return outcomes
+
+
+# ========== Evaluator ==========
+class FitnessEvaluator:
+    """
+    Scores a population by playing every agent against a set of axelrod opponents.
+    Matches are spread over a process pool; fitness is the agent's average score per match.
+    With a FitnessCache, matches an unchanged genome already played with the same player settings
+    (agent class, LLM backend, compaction, policy table; see player_config) are not scheduled again.
+    With a PopulationManifest, agents come from the manifest, agents that already have fitness for
+    the generation, match configuration and current genome are skipped (resuming an interrupted
+    generation) and new fitness is written back. Genomes are always hashed from the files on disk.
+    agent_factory(agent_folder=...) builds the agents in the workers (GenerativeAgent by default;
+    it must be picklable, e.g. FakeLLM.FakeGenerativeAgent for offline runs). Each worker keeps at
+    most pool_size agents loaded, and an agent's matches are sent to one worker in groups of up to
+    group_size so it is loaded once per group. Every match starts from the agent's on-disk memory
+    stream (see AgentPool), so results do not depend on pool_size, group_size or worker placement.
+    During a match, every compact_every per-turn observation nodes are folded into one summary of
+    the match so far, bounding the stream each decision retrieves from (None keeps them all).
+    With policy_k, each genome's memory-policy_k policy is distilled once per worker and its matches
+    are played from the table instead of asking the agent every turn (see PolicyTable).
+    """
+
+    def __init__(self, population_dir: str, opponents: Optional[List[OpponentSpec]] = None, turns: int = 200,
+                 repetitions: int = 1, noise: float = 0.0, seed: Optional[int] = 0, processes: Optional[int] = None,
+                 cache=None, agent_factory=None, manifest=None, pool_size: int = DEFAULT_CAPACITY,
+                 group_size: Optional[int] = None, compact_every: Optional[int] = 20, policy_k: Optional[int] = None):
+        self.population_dir = population_dir
+        self.policy_k = policy_k
+        self.compact_every = compact_every
+        self.agent_factory = agent_factory
+        self.pool_size = pool_size
+        self.group_size = group_size
+        self.cache = cache
+        self.manifest = manifest
+        self.opponents = opponents or DEFAULT_OPPONENTS
+        self.turns = turns
+        self.repetitions = repetitions
+        self.noise = noise
+        self.seed = seed
+        self.processes = processes or os.cpu_count()
+
+    def schedule(self, agent_ids: List[str]) -> List[dict]:
+        """One task per (agent, opponent, repetition), each with its own seed."""
+        tasks = []
+        for agent_id in agent_ids:
+            for opponent in self.opponents:
+                for repetition in range(self.repetitions):
+                    seed = None if self.seed is None else self.seed + repetition
+                    tasks.append(dict(agent_id=agent_id, opponent=opponent, turns=self.turns, seed=seed, noise=self.noise))
+        return tasks
+
+    def group(self, tasks: List[dict]) -> List[List[dict]]:
+        """Splits tasks into per-agent groups of at most group_size (all of an agent's tasks by default)."""
+        by_agent = {}
+        for task in tasks:
+            by_agent.setdefault(task["agent_id"], []).append(task)
+        groups = []
+        for agent_tasks in by_agent.values():
+            size = self.group_size or len(agent_tasks)
+            groups.extend(agent_tasks[i:i + size] for i in range(0, len(agent_tasks), size))
+        return groups
+
+    def player_config(self) -> str:
+        """Key of the settings that, with the genome, decide how an agent plays a given match."""
+        return make_key(describe_factory(self.agent_factory), os.environ.get("LLM_BACKEND", "openai"), self.compact_every,
+                        self.policy_k)
+
+    def match_config(self) -> str:
+        """Key of the settings that, with the genome, decide an agent's fitness."""
+        return make_key([opponent_name(o) for o in self.opponents], self.turns, self.repetitions, self.noise, self.seed,
+                        self.player_config())
+
+    def _genomes(self, agent_ids: List[str]) -> Dict[str, str]:
+        """Genome hashes from disk; manifest entries left stale by appends that bypassed it are refreshed."""
+        genomes = {agent_id: genome_hash(os.path.join(self.population_dir, agent_id)) for agent_id in agent_ids}
+        if self.manifest is not None:
+            stale = [agent_id for agent_id, genome in genomes.items()
+                     if agent_id in self.manifest and self.manifest.get(agent_id)["content_hash"] != genome]
+            if stale:
+                logging.info(f"Refreshing {len(stale)} manifest entries whose memory stream changed on disk")
+                self.manifest.refresh(stale)
+        return genomes
+
+    def evaluate(self, agent_ids: Optional[List[str]] = None, generation: int = 0) -> GenerationResult:
+        """Plays all matches for a generation and returns per-agent fitness and throughput."""
+        with Tracing.span("generation", generation=generation) as span:
+            result = self._evaluate(agent_ids, generation, span.span_id)
+            span.set(matches=len(result.matches), cached_matches=result.cached_matches,
+                     matches_per_second=result.matches_per_second)
+        return result
+
+    def _evaluate(self, agent_ids: Optional[List[str]], generation: int, span_id: Optional[str]) -> GenerationResult:
+        if agent_ids is None:
+            agent_ids = self.manifest.agent_ids() if self.manifest is not None else list_agents(self.population_dir)
+        # Genomes are hashed before play: results belong to the memory stream that played them
+        genomes = self._genomes(agent_ids) if self.cache is not None or self.manifest is not None else {}
+        config, player_config = self.match_config(), self.player_config()
+        evaluated = {}
+        if self.manifest is not None:
+            for agent_id in agent_ids:
+                entry = self.manifest.get(agent_id)
+                if (entry is not None and entry["fitness_generation"] == generation
+                        and entry.get("fitness_config") == config and entry.get("fitness_genome") == genomes[agent_id]):
+                    evaluated[agent_id] = entry["fitness"]
+            if evaluated:
+                logging.info(f"Generation {generation}: {len(evaluated)} agents already evaluated, skipping them")
+            agent_ids = [agent_id for agent_id in agent_ids if agent_id not in evaluated]
+        tasks = self.schedule(agent_ids)
+
+        results = []
+        if self.cache is not None:
+            pending = []
+            for task in tasks:
+                cached = self.cache.get(genomes[task["agent_id"]], opponent_name(task["opponent"]),
+                                        task["turns"], task["seed"], task["noise"], player_config)
+                if cached is not None:
+                    # A clone with the same genome may have played it; credit the agent being evaluated
+                    results.append(cached.model_copy(update={"agent_id": task["agent_id"]}))
+                else:
+                    pending.append(task)
+            logging.info(f"Generation {generation}: {len(results)} of {len(tasks)} matches served from the fitness cache")
+            tasks = pending
+        cached_matches = len(results)
+        logging.info(f"Generation {generation}: {len(agent_ids)} agents, {len(tasks)} matches on {self.processes} workers")
+
+        start = time.perf_counter()
+        # Groups are submitted one by one so an idle worker always pulls the next pending group;
+        # keeping an agent's matches together means it is loaded into one worker's pool, not every worker's.
+        groups = self.group(tasks)
+        done = 0
+        if tasks:
+            with Tracing.span("preload", parent_id=span_id):
+                preload_match_modules()
+        with ProcessPoolExecutor(max_workers=self.processes, mp_context=_mp_context(), initializer=_init_worker,
+                                 initargs=(self.population_dir, self.agent_factory, self.pool_size, self.compact_every,
+                                           self.policy_k)) as executor:
+            futures = {executor.submit(play_matches, group, parent_span=span_id): group for group in groups}
+            for future in as_completed(futures):
+                try:
+                    outcomes = future.result()
+                except Exception as e:
+                    # The worker itself died; every match of the group is lost
+                    outcomes = [(task, None, str(e)) for task in futures[future]]
+                for task, result, error in outcomes:
+                    done += 1
+                    if error is not None:
+                        logging.error(f"Match {task['agent_id']} vs {opponent_name(task['opponent'])} failed: {error}")
+                        continue
+                    results.append(result)
+                    if self.cache is not None:
+                        self.cache.put(genomes[result.agent_id], result, generation=generation, config=player_config)
+                logging.info(f"Generation {generation}: {done}/{len(tasks)} matches finished")
+        wall_time = time.perf_counter() - start
+
+        scores = {}
+        for result in results:
+            scores.setdefault(result.agent_id, []).append(result.score)
+        fitness = {agent_id: sum(s) / len(s) for agent_id, s in scores.items()}
+        if self.manifest is not None:
+            self.manifest.set_fitness(fitness, generation, config=config, genomes=genomes)
+        fitness.update(evaluated)
+        played = len(results) - cached_matches
+        throughput = played / wall_time if wall_time > 0 else 0.0
+        logging.info(f"Generation {generation}: {played} matches in {wall_time:.1f}s ({throughput:.2f} matches/sec)")
+
+        return GenerationResult(
+            generation=generation,
+            fitness=fitness,
+            matches=results,
+            cached_matches=cached_matches,
+            wall_time=wall_time,
+            matches_per_second=throughput,
+        )
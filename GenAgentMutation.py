@@ -1,161 +1,274 @@
-import sys
-import uuid
-import axelrod as axl
-sys.path.append('/Users/fatima.akram/Documents/genagents')
-from genagents import GenerativeAgent
-import openai
 import os
+import json
 import time
-import inspect
 import logging
-import instructor
-import json
-from pydantic import BaseModel
-from typing import Optional
+from functools import partial
+from typing import Optional, Tuple
+from LLMBackend import capture_usage, get_client
+from LLMCache import CachedClient, memory_fingerprint, sample_key
+from Genome import genome_hash
+from PolicyTable import PolicyTable, policy_question, parse_decision
+from MemoryStreamStore import MemoryStreamStore
+from AgentPool import AgentPool, generative_agent_class
+import Tracing
+
+# Importing this module has no side effects: axelrod is imported, the LLM client built and the default
+# agent loaded only when first used, so worker processes start fast.
 
 # ========== Setup Logging ==========
-openai.debug = True
-log_dir = "/Users/fatima.akram/Documents/logs"
-os.makedirs(log_dir, exist_ok=True)
-timestr = time.strftime("%Y%m%d-%H%M%S")
-
-logging.basicConfig(
-    filename=os.path.join(log_dir, f"match_log_{timestr}.log"),
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
-logger = logging.getLogger()
+logger = logging.getLogger(__name__)
+
+
+def configure_logging(log_dir: Optional[str] = None):
+    """Writes this run's log to a timestamped match log in log_dir (GENAGENTS_LOG_DIR, default ./logs)."""
+    log_dir = log_dir or os.environ.get("GENAGENTS_LOG_DIR", "./logs")
+    os.makedirs(log_dir, exist_ok=True)
+    timestr = time.strftime("%Y%m%d-%H%M%S")
+    logging.basicConfig(
+        filename=os.path.join(log_dir, f"match_log_{timestr}.log"),
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s"
+    )
 
 # ========== API Key ==========
-client = instructor.patch(openai.OpenAI(api_key="api-key"))
+# The client is built on first use by LLMBackend.get_client(); set LLM_BACKEND=fake to run offline
 
 # ========== Evolved Agent ==========
 EVOLVED_BASE_DIR = "./evolved_agents"
-os.makedirs(EVOLVED_BASE_DIR, exist_ok=True)
 
 # ========== Agent ==========
-AGENT_PATH = "/Users/fatima.akram/Documents/genagents/agent_bank/populations/single_agent/01fd7d2a-0357-4c1b-9f3e-8eade2d537ae"
+# Set AGENT_PATH to the agent folder played by run_match(); GENAGENTS_PATH to a genagents checkout if it is not installed
+AGENT_PATH = os.environ.get(
+    "AGENT_PATH",
+    "/Users/fatima.akram/Documents/genagents/agent_bank/populations/single_agent/01fd7d2a-0357-4c1b-9f3e-8eade2d537ae"
+)
+
+agent = None
+
+def default_agent():
+    """Loads the AGENT_PATH agent on first use, so importing this module (e.g. in a worker) stays cheap."""
+    global agent
+    if agent is None:
+        agent = generative_agent_class()(agent_folder=AGENT_PATH)
+    return agent
 
-agent = GenerativeAgent(agent_folder=AGENT_PATH)
+# ========== Decision tokens ==========
+# genagents' categorical_resp prompt holds up to this many retrieved memories plus the questions and a
+# fixed template; used to estimate its tokens (~4 characters each) when the real usage cannot be captured
+DECISION_RETRIEVED_NODES = 120
+DECISION_TEMPLATE_CHARS = 1500
 
-class GenAgentPlayer(axl.Player):
-    name = "GenAgentPlayer"
 
-    def __init__(self):
-        super().__init__()
-        self.genagent = agent
-        self.time_step = 1
+def estimate_decision_usage(genagent, questions: dict, response) -> Tuple[int, int]:
+    """(prompt_tokens, completion_tokens) estimated for one categorical_resp call."""
+    contents = [len(node.content) for node in getattr(genagent.memory_stream, "seq_nodes", [])]
+    retrieved = sum(contents) * min(1.0, DECISION_RETRIEVED_NODES / len(contents)) if contents else 0
+    prompt_chars = DECISION_TEMPLATE_CHARS + retrieved + len(json.dumps(questions))
+    return max(1, int(prompt_chars) // 4), max(1, len(json.dumps(response, default=str)) // 4)
 
-    def strategy(self, opponent):
+
+axl = None
+_player_class = None
+
+def player_class():
+    """GenAgentPlayer, defined on first use because it subclasses axelrod's Player."""
+    global axl, _player_class
+    if _player_class is None:
+        import axelrod
+        axl = axelrod
+        _player_class = _define_player()
+    return _player_class
+
+def __getattr__(name):
+    # `from GenAgentMutation import GenAgentPlayer` still works; it just imports axelrod at that point
+    if name == "GenAgentPlayer":
+        return player_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _define_player():
+    class GenAgentPlayer(axl.Player):
+        name = "GenAgentPlayer"
+
+        def __init__(self, genagent=None, agent_folder: Optional[str] = None, policy_table: Optional[PolicyTable] = None,
+                     mutate_every: Optional[int] = None, agent_id: Optional[str] = None, pool: Optional[AgentPool] = None,
+                     compactor=None):
+            super().__init__()
+            if agent_id is not None:
+                # Population agents come from a pool that loads them on first use and evicts cold ones
+                if pool is None:
+                    raise ValueError("GenAgentPlayer needs an AgentPool to play by agent_id")
+                pooled = pool.get(agent_id)
+                self.agent_folder = pooled.agent_folder
+                self.genagent = pooled.genagent
+                self.memory_store = pooled.store
+            else:
+                self.agent_folder = agent_folder or AGENT_PATH
+                self.genagent = genagent if genagent is not None else default_agent()
+                # Trait adjustments are appended to the memory stream log and folded into nodes.json periodically
+                self.memory_store = MemoryStreamStore.for_agent(self.agent_folder, compact_every=50)
+            self.agent_id = agent_id
+            self.time_step = 1
+            # Mutation normally runs once per generation (see MutationPhase); set this to also mutate every n turns
+            self.mutate_every = mutate_every
+            # Optional memo of decisions keyed on the last k moves; see PolicyTable
+            self.policy_table = policy_table
+            # Optional MemoryCompactor folding this match's per-turn observations as they pile up
+            self.compactor = compactor
+
+        def strategy(self, opponent):
+            with Tracing.span("turn", turn=len(self.history) + 1):
+                return self.decide(opponent)
+
+        def decide(self, opponent):
         
-        current_turn = len(self.history) + 1
-        logger.info(f"Turn {current_turn}: Opponent has {'no last move yet.' if len(opponent.history) == 0 else f'last move: {opponent.history[-1]}'}")
-        # Record opponent's last move if any
-        if len(opponent.history) > 0:
-            last_move = "cooperated" if opponent.history[-1] == axl.Action.C else "defected"
-            self.genagent.remember(f"Opponent {last_move} in the last round", time_step=self.time_step)
+            current_turn = len(self.history) + 1
+            logger.info(f"Turn {current_turn}: Opponent has {'no last move yet.' if len(opponent.history) == 0 else f'last move: {opponent.history[-1]}'}")
+
+            if self.policy_table is not None:
+                return self.policy_action(opponent, current_turn)
+
+            # Record opponent's last move if any
+            if len(opponent.history) > 0:
+                last_move = "cooperated" if opponent.history[-1] == axl.Action.C else "defected"
+                self.genagent.remember(f"Opponent {last_move} in the last round", time_step=self.time_step)
+                if self.compactor is not None:
+                    self.compactor.compact_turns(self.genagent, opponent.name, self.history, opponent.history)
         
-        self.time_step += 1
+            self.time_step += 1
         
-        # Every 2 rounds, tweak personality trait
-        if self.time_step % 1 == 0:
-            self.suggest_trait_change()
-
-        # Make decision
-        # In GA, you must make changes in the fitness function after the whole match/tournament, and not in between rounds
-        questions = {
-            "Should I cooperate with my opponent?": ["Yes", "No"]
-        }
-        try:
-            response = self.genagent.categorical_resp(questions)
-            logger.info(f"Turn {current_turn}: Response received: {response}")
-
-            action = axl.Action.C  
+            # Every n rounds, tweak personality trait
+            if self.mutate_every and self.time_step % self.mutate_every == 0:
+                self.suggest_trait_change()
+
+            # Make decision
+            # In GA, you must make changes in the fitness function after the whole match/tournament, and not in between rounds
+            questions = {
+                "Should I cooperate with my opponent?": ["Yes", "No"]
+            }
+            try:
+                response = self.categorical_resp(questions)
+                logger.info(f"Turn {current_turn}: Response received: {response}")
+
+                action = axl.Action.C  
             
-            # Check if response has the expected structure
-            if isinstance(response, dict) and "responses" in response:
-                responses_list = response["responses"]
+                # Check if response has the expected structure
+                if isinstance(response, dict) and "responses" in response:
+                    responses_list = response["responses"]
 
-                if isinstance(responses_list, list) and len(responses_list) > 0:
-                    decision = responses_list[0]
-                    logger.info(f"Turn {current_turn}: Decision: {decision}")
+                    if isinstance(responses_list, list) and len(responses_list) > 0:
+                        decision = responses_list[0]
+                        logger.info(f"Turn {current_turn}: Decision: {decision}")
 
-                if isinstance(decision, str):
-                    action = axl.Action.C if decision.strip().lower() == "yes" else axl.Action.D
-                    logger.info(f"Turn {current_turn}: Action chosen: {action}")
+                    if isinstance(decision, str):
+                        action = axl.Action.C if decision.strip().lower() == "yes" else axl.Action.D
+                        logger.info(f"Turn {current_turn}: Action chosen: {action}")
             
-            logger.info(f"Turn {current_turn}: Final action being returned is {action}.")
-            return action 
+                logger.info(f"Turn {current_turn}: Final action being returned is {action}.")
+                return action 
 
-        except Exception as e:
-            logger.error(f"Turn {current_turn}: Error in strategy: {e}")
-            return axl.Action.C  # Default to cooperation on error
+            except Exception as e:
+                logger.error(f"Turn {current_turn}: Error in strategy: {e}")
+                return axl.Action.C  # Default to cooperation on error
         
 
-    def suggest_trait_change(self):
-        class TraitAdjustment(BaseModel):
-            node_id: int
-            node_type: str = "trait_adjustment"
-            content: str
-            importance: int = 85
-            created: int
-            last_retrieved: int
-            pointer_id: None
-        
-        # Path to nodes.json
-        json_path = "/Users/fatima.akram/Documents/genagents/agent_bank/populations/single_agent/01fd7d2a-0357-4c1b-9f3e-8eade2d537ae/memory_stream/nodes.json"
-        print("Here is trait change suggestion")
+        def policy_action(self, opponent, current_turn):
+            """Decides from the recent-history policy table, querying the agent live only on a miss."""
+            action = self.policy_table.lookup(self.history, opponent.history)
+            if action is not None:
+                logger.info(f"Turn {current_turn}: Policy hit, action {action}")
+                return axl.Action.C if action == "C" else axl.Action.D
 
-        #These traits are chosen based on the paper Strategies for the Iterated Prisoner’s Dilemma Anagh Malik 2021
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            response_model=TraitAdjustment,
-            messages=[
-                {"role": "system", "content": "You are a strategy coach for game-theoretic agents."},
-                {"role": "user", "content": (
-                    "Analyze the agent's IPD strategy and suggest a trait adjustment to maximize points. The point is to win at any cost "
-                    "Focus on one of: Nice (cooperation), Retaliatory (punishment), "
-                    "Forgiving (reconciliation), Clear (consistency). "
-                    "Format: 'Trait: adjustment direction with strategic reasoning'"
-                )}
-            ]
-        )
-            
-        logger.info(f"Structured trait change: {response}")
-        print(f"Structured trait change: {response.model_dump()}")
-            
-         # Load existing nodes and determine next node ID
-        try:
-            with open(json_path, 'r') as f:
-                nodes = json.load(f)
-                print(f"Reading json at {json_path}")
-                if not isinstance(nodes, list):
-                    nodes = [nodes]
-                    
-            # Find max node ID
-            max_id = max(node.get('node_id', 0) for node in nodes) if nodes else 0
-            new_id = max_id + 1
-            
-            # Set new node ID
-            response.node_id = new_id
+            k = self.policy_table.k
+            own = "".join(str(move) for move in self.history[-k:])
+            opp = "".join(str(move) for move in opponent.history[-k:])
+            question = policy_question(own, opp)
+            try:
+                response = self.categorical_resp({question: ["Yes", "No"]})
+                action = parse_decision(response["responses"][0])
+            except Exception as e:
+                logger.error(f"Turn {current_turn}: Error in policy query: {e}")
+                return axl.Action.C  # Default to cooperation on error
+            if action is None:
+                return axl.Action.C
+            self.policy_table.record(self.history, opponent.history, action)
+            logger.info(f"Turn {current_turn}: Policy miss, queried action {action}")
+            return axl.Action.C if action == "C" else axl.Action.D
+
+        def distill_policy(self, k: int = 3, **kwargs) -> PolicyTable:
+            """
+            Distills the agent's memory-k policy up front, asking through categorical_resp (so through
+            the LLM cache and tracing). Pass the table as policy_table to a player to play from it.
+            """
+            table = PolicyTable(genome_hash(self.agent_folder), k=k)
+            return table.distill(partial(self.categorical_resp, kind="policy"), **kwargs)
+
+        def categorical_resp(self, questions, kind: str = "decision"):
+            """Asks the agent the decision questions, through the LLM cache when one is configured."""
+            client = get_client()
+            with Tracing.span("llm", kind=kind) as span, capture_usage() as usages:
+                if isinstance(client, CachedClient):
+                    response = client.memoize(
+                        "categorical_resp",
+                        [memory_fingerprint(self.genagent), questions],
+                        lambda: self.genagent.categorical_resp(questions)
+                    )
+                else:
+                    response = self.genagent.categorical_resp(questions)
+                self.record_decision_usage(span, usages, questions, response)
+            return response
+
+        def record_decision_usage(self, span, usages, questions, response):
+            """Tokens of a decision: as captured from genagents' OpenAI calls, else estimated (and marked so)."""
+            if not Tracing.enabled() or span.counters.get("cache_hits"):
+                return
+            if usages:
+                for usage in usages:
+                    span.add("prompt_tokens", getattr(usage, "prompt_tokens", 0) or 0)
+                    span.add("completion_tokens", getattr(usage, "completion_tokens", 0) or 0)
+            else:
+                span.record_estimate(*estimate_decision_usage(self.genagent, questions, response))
+
+        def suggest_trait_change(self):
+            # Imported here: MutationPhase pulls in pydantic, which would slow every worker's startup
+            from MutationPhase import MUTATION_MODEL, TraitAdjustment, trait_messages
+            print("Here is trait change suggestion")
+
+            # Same prompt every time: cache it per genome and turn so each mutation gets its own answer
+            sample = f"turn-mutation-{genome_hash(self.agent_folder)}-{len(self.history)}"
+            with Tracing.span("llm", kind="mutation") as span, sample_key(sample):
+                response = get_client().chat.completions.create(
+                    model=MUTATION_MODEL,
+                    response_model=TraitAdjustment,
+                    messages=trait_messages()
+                )
+                span.record_usage(response)
             
-            # Append new node
-            nodes.append(response.model_dump())
+            logger.info(f"Structured trait change: {response}")
+            print(f"Structured trait change: {response.model_dump()}")
             
-            # Save back to file
-            with open(json_path, 'w') as f:
-                json.dump(nodes, f, indent=2)
-                
-            logger.info(f"Added new trait adjustment node with ID: {new_id}")
-            print(f"Added new trait adjustment node with ID: {new_id}")
+            # Append the node to the memory stream log; the store assigns the next node ID
+            try:
+                new_id = self.memory_store.append(response.model_dump())
+                response.node_id = new_id
+
+                logger.info(f"Added new trait adjustment node with ID: {new_id}")
+                print(f"Added new trait adjustment node with ID: {new_id}")
             
-        except Exception as e:
-            logger.error(f"Error updating nodes.json: {e}")
-            print(f"Error updating nodes.json: {e}")
+            except Exception as e:
+                logger.error(f"Error appending to memory stream: {e}")
+                print(f"Error appending to memory stream: {e}")
+
+    # Lets instances pickle and print as GenAgentMutation.GenAgentPlayer
+    GenAgentPlayer.__qualname__ = "GenAgentPlayer"
+    GenAgentPlayer.__module__ = __name__
+    globals()["GenAgentPlayer"] = GenAgentPlayer
+    return GenAgentPlayer
+
 
 # ========== Match ==========
 def run_match():
     logger.info("Setting up match")
+    GenAgentPlayer = player_class()
 
     players = [
         axl.TitForTat(),
@@ -174,21 +287,26 @@ def run_match():
     match.play()
     logger.info("match completed.")
     logger.info(f"match scores: {match.scores()}")
+    if players[1].memory_store.pending:
+        players[1].memory_store.compact()
     winner = match.winner()
     logger.info(f"match winner is: {winner}")
     print(f"winner strategy is {winner}")
 
-try:
-    print("Testing API connection...")
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": "Hello"}]
-    )
-    logger.info(f"API response: {response}")
-    print("API connection successful!")
+if __name__ == "__main__":
+    configure_logging()
+    Tracing.configure_from_env()
+    try:
+        print("Testing API connection...")
+        response = get_client().chat.completions.create(
+            model="gpt-4o",
+            messages=[{"role": "user", "content": "Hello"}]
+        )
+        logger.info(f"API response: {response}")
+        print("API connection successful!")
     
-    print("\nInitialising match...")
-    run_match()
+        print("\nInitialising match...")
+        run_match()
     
-except Exception as e:
-    print(f"Error while playing match: {str(e)}")
\ No newline at end of file
+    except Exception as e:
+        print(f"Error while playing match: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,15 @@
+import os
+from LLMCache import make_key
+from MemoryStreamStore import MemoryStreamStore
+
+
+def nodes_path(agent_folder: str) -> str:
+    return os.path.join(agent_folder, "memory_stream", "nodes.json")
+
+
+def genome_hash(agent_folder: str) -> str:
+    """
+    Content hash of an agent's memory stream on disk, including appended nodes not yet compacted.
+    It changes whenever a node is added or edited.
+    """
+    return make_key(MemoryStreamStore.for_agent(agent_folder).nodes())
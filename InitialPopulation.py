@@ -1,21 +1,19 @@
 import os
 import json
 import uuid
-import instructor
-import openai
+import time
+import itertools
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional
 import logging
-
-# --- Configuration ---
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-try:
-    client = instructor.patch(openai.OpenAI(api_key="api-key"))
-except Exception as e:
-    logging.error("OpenAI client could not be initialized. Make sure your OPENAI_API_KEY is set.")
-    logging.error(e)
-    exit()
+from RateLimiter import RateLimiter, RetryableError, retry_with_backoff
+from LLMBackend import get_client
+from LLMCache import sample_key
+from PopulationManifest import PopulationManifest
+import Tracing
 
 # --- Pydantic Models for Data Structure ---
 class Node(BaseModel):
@@ -34,9 +32,23 @@ class AgentMemory(BaseModel):
     """
     nodes: List[Node] = Field(..., description="A list of dialogue nodes that make up the agent's memory.")
 
+class InterviewAnswer(BaseModel):
+    """One streamed answer from a chunk of the interview."""
+    question_number: int = Field(..., description="The number of the question being answered, as numbered in the prompt.")
+    answer: str = Field(..., description="The persona's answer to that question, in the first person.")
+
+# Questions per request in chunked generation
+CHUNK_SIZE = 15
+
+# Rough completion size of a full interview, used to budget tokens-per-minute before the call is made
+EXPECTED_COMPLETION_TOKENS = 6000
+
 class InitialPopulation:
-    def __init__(self, output_dir):
+    def __init__(self, output_dir, client=None):
         self.output_dir = output_dir
+        # Any object exposing chat.completions.create(...) works here, e.g. a FakeLLM for offline runs
+        self.client = client if client is not None else get_client()
+        self.manifest = PopulationManifest(output_dir)
         self.questions = self.get_interview_questions()
 
     def get_interview_questions(self) -> List[str]:
@@ -153,50 +165,158 @@ class InitialPopulation:
             "And that was the last question I wanted to ask today. Thank you so much again for your time <participant’s name>. It was really wonderful getting to know you through this interview. Now, we will take you back to the Home Screen so that you may finish the rest of the study!"
         ]
 
-    def generate_agent_memory(self) -> Optional[AgentMemory]:
-        """Generates a new agent's memory using the LLM."""
-        if not self.questions:
-            logging.error("No questions provided to generate agent memory.")
-            return None
-
-        # Create a prompt that asks for answers to the questions
+    def build_prompt(self) -> str:
+        """Builds the interview prompt asking the LLM to answer every question as one persona."""
         prompt = "You are an AI assistant. Create a unique persona and answer the following interview questions from their perspective:\n\n"
         for q in self.questions:
             prompt += f"Interviewer: {q}\nAgent:\n\n"
+        return prompt
 
-        try:
-            logging.info("Generating new agent memory...")
-            response = client.chat.completions.create(
+    def request_agent_memory(self) -> AgentMemory:
+        """Makes a single LLM call for a new agent's memory. Errors are raised to the caller."""
+        with Tracing.span("llm", kind="persona") as span:
+            response = self.client.chat.completions.create(
                 model="gpt-4-turbo",
                 messages=[
                     {"role": "system", "content": "You are a creative AI assistant that generates detailed and unique personas."},
-                    {"role": "user", "content": prompt}
+                    {"role": "user", "content": self.build_prompt()}
                 ],
                 max_retries=2,
             )
-            
-            # Extract the answers from the response
-            answers = response.choices[0].message.content.strip().split("\n\n")
-            
-            # Combine questions and answers into nodes
-            nodes = []
-            for i, (question, answer) in enumerate(zip(self.questions, answers)):
-                nodes.append(Node(
-                    node_id=i,
-                    node_type="observation",
-                    content=f"Interviewer: {question}\n\n{answer}",
-                    importance=80,  # Placeholder importance
-                    created=0,      # Placeholder timestamp
-                    last_retrieved=0 # Placeholder timestamp
-                ))
-            
-            return AgentMemory(nodes=nodes)
+            span.record_usage(response)
+
+        # Extract the answers from the response
+        answers = response.choices[0].message.content.strip().split("\n\n")
+
+        # Combine questions and answers into nodes
+        nodes = []
+        for i, answer in enumerate(answers[:len(self.questions)]):
+            nodes.append(self.make_node(i, answer))
+
+        return AgentMemory(nodes=nodes)
+
+    def make_node(self, index: int, answer: str) -> Node:
+        return Node(
+            node_id=index,
+            node_type="observation",
+            content=f"Interviewer: {self.questions[index]}\n\n{answer}",
+            importance=80,  # Placeholder importance
+            created=0,      # Placeholder timestamp
+            last_retrieved=0 # Placeholder timestamp
+        )
+
+    # --- Chunked generation ---
+    def request_persona_seed(self) -> str:
+        """Asks for a short persona description that every chunk of the interview answers from."""
+        with Tracing.span("llm", kind="persona_seed") as span:
+            response = self.client.chat.completions.create(
+                model="gpt-4-turbo",
+                messages=[
+                    {"role": "system", "content": "You are a creative AI assistant that generates detailed and unique personas."},
+                    {"role": "user", "content": (
+                        "Create a unique persona. In one paragraph give their name, age, place of birth and residence, "
+                        "family, education, occupation, income, health, politics, religion, values and life story."
+                    )}
+                ],
+            )
+            span.record_usage(response)
+        return response.choices[0].message.content.strip()
+
+    def request_chunk(self, persona: str, indices: List[int], on_node) -> None:
+        """Streams answers for the questions at `indices`, calling on_node(node) as each answer arrives."""
+        prompt = f"You are the following person:\n\n{persona}\n\nAnswer each interview question from their perspective:\n\n"
+        for i in indices:
+            prompt += f"Question {i + 1}: {self.questions[i]}\n"
+
+        with Tracing.span("llm", kind="persona_chunk", questions=len(indices)) as span:
+            answers = self.client.chat.completions.create(
+                model="gpt-4-turbo",
+                response_model=Iterable[InterviewAnswer],
+                stream=True,
+                messages=[
+                    {"role": "system", "content": "You answer interview questions in character, one answer per question."},
+                    {"role": "user", "content": prompt}
+                ],
+            )
+            wanted = set(indices)
+            for item in answers:
+                index = item.question_number - 1
+                if index not in wanted:
+                    logging.warning(f"Ignoring answer to unexpected question number {item.question_number}")
+                    continue
+                wanted.discard(index)
+                on_node(self.make_node(index, item.answer.strip()))
+            span.set(answered=len(indices) - len(wanted))
+
+    def generate_agent_memory_chunked(self, chunk_size: int = CHUNK_SIZE, concurrency: Optional[int] = None,
+                                      limiter: Optional[RateLimiter] = None, max_retries: int = 3) -> Optional[AgentMemory]:
+        """
+        Generates an agent's memory as concurrent chunks of the questionnaire sharing one persona seed.
+        Answers are matched to questions by number, so nodes cannot be misaligned, and each Node is
+        validated as soon as its answer streams in. A chunk that fails or leaves questions unanswered
+        is retried for its missing questions only.
+        """
+        start = time.perf_counter()
+        first_node_at = []
+        nodes: Dict[int, Node] = {}
+        lock = threading.Lock()
+
+        def on_node(node: Node):
+            with lock:
+                if not first_node_at:
+                    first_node_at.append(time.perf_counter() - start)
+                nodes[node.node_id] = node
+
+        def run_chunk(indices: List[int]):
+            def attempt():
+                with lock:
+                    missing = [i for i in indices if i not in nodes]
+                if not missing:
+                    return
+                if limiter is not None:
+                    limiter.acquire(len(missing) * EXPECTED_COMPLETION_TOKENS // len(self.questions))
+                self.request_chunk(persona, missing, on_node)
+                with lock:
+                    still_missing = [i for i in missing if i not in nodes]
+                if still_missing:
+                    # Retried for these questions only; answers already received are kept
+                    raise RetryableError(f"No answers for questions {[i + 1 for i in still_missing]}")
+            retry_with_backoff(attempt, max_retries=max_retries, description="Interview chunk")
+
+        try:
+            if limiter is not None:
+                limiter.acquire()
+            persona = retry_with_backoff(self.request_persona_seed, max_retries=max_retries, description="Persona seed")
+            chunks = [list(range(i, min(i + chunk_size, len(self.questions))))
+                      for i in range(0, len(self.questions), chunk_size)]
+            with ThreadPoolExecutor(max_workers=concurrency or len(chunks)) as executor:
+                # Each chunk runs in a copy of this context, so it keeps the sample key and the parent span
+                for future in [executor.submit(contextvars.copy_context().run, run_chunk, chunk) for chunk in chunks]:
+                    future.result()
         except Exception as e:
             logging.error(f"An error occurred while generating agent memory: {e}")
             return None
 
-    def save_agent_to_file(self, agent_memory: AgentMemory):
-        """Saves the generated agent memory to a file."""
+        total = time.perf_counter() - start
+        logging.info(f"Generated {len(nodes)} nodes in {len(chunks)} chunks: "
+                     f"first node after {first_node_at[0]:.1f}s, total {total:.1f}s")
+        return AgentMemory(nodes=[nodes[i] for i in sorted(nodes)])
+
+    def generate_agent_memory(self) -> Optional[AgentMemory]:
+        """Generates a new agent's memory using the LLM."""
+        if not self.questions:
+            logging.error("No questions provided to generate agent memory.")
+            return None
+
+        try:
+            logging.info("Generating new agent memory...")
+            return self.request_agent_memory()
+        except Exception as e:
+            logging.error(f"An error occurred while generating agent memory: {e}")
+            return None
+
+    def save_agent_to_file(self, agent_memory: AgentMemory, persona_index: Optional[int] = None) -> str:
+        """Saves the generated agent memory to a file, adds it to the manifest and returns the new agent id."""
         agent_id = str(uuid.uuid4())
         agent_dir = os.path.join(self.output_dir, agent_id, 'memory_stream')
         os.makedirs(agent_dir, exist_ok=True)
@@ -205,22 +325,93 @@ class InitialPopulation:
         
         nodes_data = [node.model_dump() for node in agent_memory.nodes]
         
-        with open(file_path, 'w') as f:
+        # Write to a temporary file and rename so readers never see a half-written nodes.json
+        tmp_path = f"{file_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
             json.dump(nodes_data, f, indent=2)
-        
+        os.replace(tmp_path, file_path)
+
+        # Registered only once nodes.json is in place, so the manifest never lists a partial agent
+        fields = {"persona_index": persona_index} if persona_index is not None else {}
+        self.manifest.register(agent_id, generation=0, **fields)
         logging.info(f"Saved new agent to {file_path}")
+        return agent_id
+
+    def _generate_with_backoff(self, index: int, size: int, limiter: Optional[RateLimiter],
+                               max_retries: int, chunk_size: Optional[int] = None,
+                               persona_index: Optional[int] = None) -> Optional[AgentMemory]:
+        """
+        Generates one agent, waiting on the rate limiter and retrying transient errors (e.g. 429s).
+        The persona prompt is the same for every agent, so its LLM calls are cached under persona_index.
+        """
+        logging.info(f"--- Generating Agent {index + 1}/{size} ---")
+        sample = f"persona-{persona_index}" if persona_index is not None else None
+        with Tracing.span("agent_generation", index=index, chunked=bool(chunk_size)), sample_key(sample):
+            return self._generate_agent(limiter, max_retries, chunk_size)
+
+    def _generate_agent(self, limiter: Optional[RateLimiter], max_retries: int,
+                        chunk_size: Optional[int]) -> Optional[AgentMemory]:
+        if chunk_size:
+            return self.generate_agent_memory_chunked(chunk_size=chunk_size, limiter=limiter, max_retries=max_retries)
+        estimated_tokens = len(self.build_prompt()) // 4 + EXPECTED_COMPLETION_TOKENS
+
+        def attempt():
+            if limiter is not None:
+                limiter.acquire(estimated_tokens)
+            return self.request_agent_memory()
+
+        try:
+            return retry_with_backoff(attempt, max_retries=max_retries, description="Agent generation")
+        except Exception as e:
+            logging.error(f"An error occurred while generating agent memory: {e}")
+            return None
+
+    def create_population(self, size: int, concurrency: int = 1, requests_per_minute: Optional[int] = None,
+                          tokens_per_minute: Optional[int] = None, max_retries: int = 3,
+                          chunk_size: Optional[int] = None, resume: bool = True) -> List[str]:
+        """
+        Creates a population of agents and returns the ids of those saved.
+        Up to `concurrency` agents are generated at once, throttled by the optional per-minute limits.
+        With chunk_size set, each agent's interview is generated in concurrent streamed chunks.
+        With resume set, `size` is the target population: agents already in the manifest count
+        towards it, so an interrupted run picks up where it stopped.
+        Each new agent gets the lowest persona index no saved agent has; it keys the agent's LLM
+        calls in the cache, so a cached rerun replays the same agents instead of cloning one answer.
+        """
+        if not self.questions:
+            logging.error("No questions provided to generate agent memory.")
+            return []
+
+        self.manifest.checkpoint("population_size", size)
+        if resume:
+            self.manifest.rebuild()
+            existing = len(self.manifest.filter(generation=0))
+            if existing:
+                logging.info(f"Resuming: {existing}/{size} agents already in {self.manifest.path}")
+            size = max(0, size - existing)
+
+        used = {entry.get("persona_index") for entry in self.manifest.filter(generation=0)}
+        persona_indices = list(itertools.islice((i for i in itertools.count() if i not in used), size))
+
+        limiter = None
+        if requests_per_minute or tokens_per_minute:
+            limiter = RateLimiter(requests_per_minute=requests_per_minute, tokens_per_minute=tokens_per_minute)
+
+        agent_ids = []
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            futures = {}
+            for i in range(size):
+                futures[executor.submit(Tracing.in_context(self._generate_with_backoff), i, size, limiter, max_retries,
+                                        chunk_size, persona_indices[i])] = i
+
+            for done, future in enumerate(as_completed(futures), start=1):
+                i = futures[future]
+                agent_memory = future.result()
+
+                if agent_memory:
+                    agent_ids.append(self.save_agent_to_file(agent_memory, persona_index=persona_indices[i]))
+                else:
+                    logging.warning(f"Skipping agent {i + 1} due to generation failure.")
+                logging.info(f"Progress: {done}/{size} agents finished ({len(agent_ids)} saved)")
 
-    def create_population(self, size: int):
-        """Creates a population of agents."""
-        if not os.path.exists(self.output_dir):
-            os.makedirs(self.output_dir)
-            logging.info(f"Created output directory: {self.output_dir}")
-
-        for i in range(size):
-            logging.info(f"--- Generating Agent {i + 1}/{size} ---")
-            agent_memory = self.generate_agent_memory()
-            
-            if agent_memory:
-                self.save_agent_to_file(agent_memory)
-            else:
-                logging.warning(f"Skipping agent {i + 1} due to generation failure.")
+        return agent_ids
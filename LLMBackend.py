@@ -0,0 +1,108 @@
+import os
+import sys
+import logging
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# --- Configuration ---
+# LLM_BACKEND selects the client: "openai" (default) or "fake" for the deterministic local FakeLLM.
+# FakeLLM settings: LLM_FAKE_LATENCY (seconds), LLM_FAKE_ERROR_RATE, LLM_FAKE_SEED.
+_client = None
+_lock = threading.Lock()
+
+# genagents calls OpenAI through its own client, so its usage never reaches our spans; see capture_usage()
+_captured: contextvars.ContextVar = contextvars.ContextVar("captured_usage", default=None)
+_hooked = False
+
+
+def _build_client():
+    import LLMCache
+    backend = os.environ.get("LLM_BACKEND", "openai")
+    if backend == "fake":
+        from FakeLLM import FakeLLM
+        client = FakeLLM(
+            latency=float(os.environ.get("LLM_FAKE_LATENCY", "0")),
+            error_rate=float(os.environ.get("LLM_FAKE_ERROR_RATE", "0")),
+            seed=int(os.environ.get("LLM_FAKE_SEED", "0")),
+        )
+    elif backend == "openai":
+        import instructor
+        import openai
+        client = instructor.patch(openai.OpenAI(api_key=os.environ.get("OPENAI_API_KEY", "api-key")))
+    else:
+        raise ValueError(f"Unknown LLM_BACKEND {backend!r}, expected 'openai' or 'fake'")
+    logging.info(f"Using {backend} LLM backend")
+    # Set LLM_CACHE_PATH (and LLM_CACHE_MODE=replay_only for offline runs) to cache every LLM call on disk
+    return LLMCache.from_env(client)
+
+
+def preload():
+    """
+    Imports what the configured backend's client needs without keeping a client, so processes forked
+    afterwards inherit the modules but never share a client's open connections.
+    """
+    import LLMCache  # noqa: F401
+    if os.environ.get("LLM_BACKEND", "openai") == "openai":
+        import instructor
+        import openai
+        # openai and httpx import most of their modules when the first client is built
+        instructor.patch(openai.OpenAI(api_key="preload"))
+
+
+def get_client():
+    """The shared chat-completions client, built on first use rather than at import time."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = _build_client()
+    return _client
+
+
+def set_client(client):
+    """Injects a client (e.g. a FakeLLM or a CachedClient) for everything that calls get_client()."""
+    global _client
+    with _lock:
+        _client = client
+
+
+# ========== Usage capture ==========
+def _hook_openai() -> bool:
+    """Wraps openai's chat Completions.create once, so calls from any client can report their usage."""
+    global _hooked
+    if _hooked or "openai" not in sys.modules:
+        # Nothing has imported openai (e.g. fake agents): there are no calls to capture
+        return _hooked
+    with _lock:
+        if not _hooked:
+            from openai.resources.chat.completions import Completions
+            create = Completions.create
+
+            @functools.wraps(create)
+            def create_and_capture(self, *args, **kwargs):
+                response = create(self, *args, **kwargs)
+                usages = _captured.get()
+                if usages is not None and getattr(response, "usage", None) is not None:
+                    usages.append(response.usage)
+                return response
+
+            Completions.create = create_and_capture
+            _hooked = True
+    return _hooked
+
+
+@contextmanager
+def capture_usage():
+    """
+    Collects the usage of every OpenAI chat completion made in this context (by any client, e.g.
+    genagents' own) into the yielded list. The list stays empty when openai is not in use.
+    """
+    _hook_openai()
+    usages = []
+    token = _captured.set(usages)
+    try:
+        yield usages
+    finally:
+        _captured.reset(token)
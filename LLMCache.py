@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Callable, Iterator, Optional, get_args
+import Tracing
+
+# --- Cache modes ---
+READ_THROUGH = "read_through"  # serve hits from disk, call the API on a miss and store the result
+WRITE_ONLY = "write_only"      # always call the API, store every result (refreshes the cache)
+REPLAY_ONLY = "replay_only"    # never call the API; a miss is an error (fully offline, deterministic runs)
+MODES = (READ_THROUGH, WRITE_ONLY, REPLAY_ONLY)
+
+# Call options that do not change the answer and are left out of the cache key
+UNKEYED_PARAMS = {"max_retries", "timeout", "extra_headers"}
+
+
+# Extra key part for generative calls whose prompt is the same for every sample (persona generation,
+# trait mutation); without it every agent after the first would be served the first agent's answer
+_sample: contextvars.ContextVar = contextvars.ContextVar("llm_cache_sample", default=None)
+
+
+class CacheMiss(KeyError):
+    """Raised in replay-only mode when a call has no cached result."""
+
+
+@contextmanager
+def sample_key(key: Optional[str]):
+    """
+    Adds `key` (e.g. the new agent's index) to the cache key of every call made in this context, so
+    identical prompts asked for different samples are cached apart. Keys must be deterministic for
+    replay to reproduce a run. Contexts are per thread: enter it in the thread that makes the call.
+    """
+    token = _sample.set(key)
+    try:
+        yield
+    finally:
+        _sample.reset(token)
+
+
+def _jsonable(value: Any) -> Any:
+    """Converts pydantic models and namespaces into plain JSON-serialisable data."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, SimpleNamespace):
+        return {k: _jsonable(v) for k, v in vars(value).items()}
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return value
+
+
+def _to_namespace(value: Any) -> Any:
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: _to_namespace(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_to_namespace(v) for v in value]
+    return value
+
+
+def _item_model(response_model):
+    """The item class of an Iterable[Model] response model (instructor's streamed lists), else None."""
+    args = get_args(response_model) if response_model is not None else ()
+    return args[0] if args and hasattr(args[0], "model_json_schema") else None
+
+
+def _schema(response_model) -> Any:
+    if response_model is None:
+        return None
+    if hasattr(response_model, "model_json_schema"):
+        return response_model.model_json_schema()
+    item_model = _item_model(response_model)
+    return {"items": item_model.model_json_schema()} if item_model is not None else str(response_model)
+
+
+def make_key(*parts: Any) -> str:
+    """Content address for a call: sha256 over the canonical JSON of its parts."""
+    payload = json.dumps(_jsonable(list(parts)), sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Content-addressed on-disk store for LLM results, backed by sqlite.
+    Entries are evicted least-recently-used once the total size exceeds max_bytes.
+    """
+
+    def __init__(self, path: str, max_bytes: Optional[int] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any):
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, data, len(data), time.time())
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if not self.max_bytes:
+            return
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM cache ORDER BY last_access").fetchall():
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        logging.info(f"LLM cache evicted entries down to {total} bytes")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedClient:
+    """
+    Wraps an (instructor-patched) OpenAI client so chat.completions.create goes through an LLMCache.
+    The key covers the model, messages, response_model schema and sampling parameters, plus the
+    sample key of the calling context (see sample_key). Streamed calls are recorded as the list of
+    items once the caller has read the whole stream, and replayed as an iterator over that list.
+    """
+
+    def __init__(self, client, cache: LLMCache, mode: str = READ_THROUGH):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}, expected one of {MODES}")
+        self.client = client
+        self.cache = cache
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _lookup(self, key: str, description: str) -> Optional[Any]:
+        if self.mode == WRITE_ONLY:
+            return None
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            Tracing.current().add("cache_hits")
+            return cached
+        self.misses += 1
+        Tracing.current().add("cache_misses")
+        if self.mode == REPLAY_ONLY:
+            raise CacheMiss(f"No cached result for {description} (key {key[:12]})")
+        return None
+
+    def create(self, **kwargs):
+        """Cached drop-in for client.chat.completions.create(...)."""
+        response_model = kwargs.get("response_model")
+        schema = _schema(response_model)
+        params = {k: v for k, v in kwargs.items()
+                  if k not in UNKEYED_PARAMS and k not in ("model", "messages", "response_model")}
+        sample = _sample.get()
+        key = make_key("chat.completions", kwargs.get("model"), kwargs.get("messages"), schema, params,
+                       *([sample] if sample is not None else []))
+
+        cached = self._lookup(key, f"{kwargs.get('model')} completion")
+        if cached is not None:
+            restored = self._restore(cached, response_model)
+            return iter(restored) if kwargs.get("stream") else restored
+
+        response = self.client.chat.completions.create(**kwargs)
+        if kwargs.get("stream"):
+            return self._record_stream(key, response)
+        self.cache.put(key, _jsonable(response))
+        return response
+
+    def _record_stream(self, key: str, stream) -> Iterator[Any]:
+        """Passes the stream's items through and stores them once it is exhausted (not if the caller stops early)."""
+        items = []
+        for item in stream:
+            items.append(item)
+            yield item
+        self.cache.put(key, _jsonable(items))
+
+    def memoize(self, namespace: str, key_parts: Any, fn: Callable[[], Any]) -> Any:
+        """Caches call sites that do not go through this client (e.g. genagents' categorical_resp)."""
+        key = make_key(namespace, key_parts)
+        cached = self._lookup(key, namespace)
+        if cached is not None:
+            return cached
+        result = fn()
+        self.cache.put(key, _jsonable(result))
+        return result
+
+    @staticmethod
+    def _restore(data: Any, response_model=None) -> Any:
+        item_model = _item_model(response_model)
+        if item_model is not None:
+            return [item_model.model_validate(item) for item in data]
+        if isinstance(data, list):
+            return _to_namespace(data)
+        if response_model is not None:
+            return response_model.model_validate(data)
+        try:
+            from openai.types.chat import ChatCompletion
+            return ChatCompletion.model_validate(data)
+        except Exception:
+            return _to_namespace(data)
+
+
+def from_env(client):
+    """Wraps client in a CachedClient when LLM_CACHE_PATH is set (mode from LLM_CACHE_MODE, size from LLM_CACHE_MAX_BYTES)."""
+    path = os.environ.get("LLM_CACHE_PATH")
+    if not path:
+        return client
+    max_bytes = os.environ.get("LLM_CACHE_MAX_BYTES")
+    cache = LLMCache(path, max_bytes=int(max_bytes) if max_bytes else None)
+    mode = os.environ.get("LLM_CACHE_MODE", READ_THROUGH)
+    logging.info(f"Caching LLM calls in {path} ({mode})")
+    return CachedClient(client, cache, mode=mode)
+
+
+def memory_fingerprint(genagent) -> str:
+    """Hash of a GenerativeAgent's in-memory stream; any remembered node changes it."""
+    nodes = getattr(genagent.memory_stream, "seq_nodes", [])
+    return make_key([(node.node_type, node.content) for node in nodes])
@@ -0,0 +1,186 @@
+import re
+import logging
+from pydantic import BaseModel
+from typing import Dict, List, Optional, Sequence
+
+# The per-turn node GenAgentPlayer remembers, e.g. "Opponent defected in the last round"
+OBSERVATION = re.compile(r"^Opponent (cooperated|defected) in the last round$")
+SUMMARY = re.compile(
+    r"^Match summary vs (?P<opponent>.+?) \((?P<matches>\d+) match(?:es)?, (?P<rounds>\d+) rounds\): "
+    r"the opponent cooperated (?P<cooperations>\d+)/\d+ rounds and answered my defections "
+    r"with defection (?P<retaliations>\d+)/(?P<provocations>\d+) times\."
+)
+# The summary of a match still being played, replaced as the match goes on
+CURRENT = re.compile(r"^Current match vs (?P<opponent>.+?) so far \(")
+
+# Run-length move strings longer than this many runs are left out of a summary
+MAX_RUNS = 12
+
+
+def _move(move) -> str:
+    return "C" if str(move) == "C" else "D"
+
+
+def run_length(moves: Sequence) -> str:
+    """'CCCDDC' -> '3C 2D 1C'."""
+    runs = []
+    for move in map(_move, moves):
+        if runs and runs[-1][1] == move:
+            runs[-1][0] += 1
+        else:
+            runs.append([1, move])
+    return " ".join(f"{count}{move}" for count, move in runs)
+
+
+class MatchSummary(BaseModel):
+    """Statistics that replace a match's per-turn observation nodes."""
+    opponent: str
+    matches: int = 1
+    rounds: int
+    cooperations: int
+    retaliations: int = 0  # opponent defections straight after one of my defections
+    provocations: int = 0  # my defections followed by another round
+    moves: Optional[str] = None
+    in_progress: bool = False
+
+    @classmethod
+    def from_history(cls, opponent: str, opponent_history: Sequence, own_history: Optional[Sequence] = None,
+                     in_progress: bool = False) -> "MatchSummary":
+        opponent_moves = [_move(m) for m in opponent_history]
+        own_moves = [_move(m) for m in own_history or []]
+        provocations = sum(1 for move in own_moves[:len(opponent_moves) - 1] if move == "D")
+        retaliations = sum(1 for i, move in enumerate(own_moves[:len(opponent_moves) - 1])
+                           if move == "D" and opponent_moves[i + 1] == "D")
+        moves = run_length(opponent_moves)
+        return cls(opponent=opponent, rounds=len(opponent_moves), cooperations=opponent_moves.count("C"),
+                   retaliations=retaliations, provocations=provocations,
+                   moves=moves if moves.count(" ") < MAX_RUNS else None, in_progress=in_progress)
+
+    @classmethod
+    def parse(cls, content: str) -> Optional["MatchSummary"]:
+        match = SUMMARY.match(content)
+        if match is None:
+            return None
+        fields = {k: v if k == "opponent" else int(v) for k, v in match.groupdict().items()}
+        return cls(**fields)
+
+    @classmethod
+    def merge(cls, summaries: List["MatchSummary"]) -> "MatchSummary":
+        return cls(opponent=summaries[0].opponent,
+                   matches=sum(s.matches for s in summaries),
+                   rounds=sum(s.rounds for s in summaries),
+                   cooperations=sum(s.cooperations for s in summaries),
+                   retaliations=sum(s.retaliations for s in summaries),
+                   provocations=sum(s.provocations for s in summaries))
+
+    def content(self) -> str:
+        if self.in_progress:
+            head = f"Current match vs {self.opponent} so far ({self.rounds} rounds)"
+        else:
+            head = (f"Match summary vs {self.opponent} ({self.matches} {'match' if self.matches == 1 else 'matches'}, "
+                    f"{self.rounds} rounds)")
+        text = (f"{head}: the opponent cooperated {self.cooperations}/{self.rounds} rounds and "
+                f"answered my defections with defection {self.retaliations}/{self.provocations} times.")
+        if self.moves:
+            text += f" Opponent moves: {self.moves}."
+        return text
+
+
+class MemoryCompactor:
+    """
+    Folds an agent's per-turn observation nodes into summary nodes. Interview, trait adjustment
+    and every other node are left untouched.
+
+    During a match, compact_turns() replaces the observations with one summary of the match so far
+    whenever `every` of them have piled up, so a match adds at most `every` + 1 nodes however long
+    it runs. After a match, compact_match() turns them into one MatchSummary node, and keeps at most
+    keep_recent match summaries per opponent by merging older ones into a single running summary,
+    for agents kept in memory across matches (population agents are reset after every match, see
+    AgentPool).
+
+    Works on a GenerativeAgent's in-memory stream (seq_nodes, id_to_node, embeddings); remaining
+    nodes are renumbered 0..n-1, which genagents assumes when it assigns new node ids.
+    """
+
+    def __init__(self, keep_recent: int = 3, every: int = 20):
+        self.keep_recent = max(1, keep_recent)
+        self.every = max(1, every)
+
+    def compact_turns(self, genagent, opponent: str, own_history: Sequence,
+                      opponent_history: Sequence) -> Optional[Dict[str, int]]:
+        """
+        Run each turn: once `every` observation nodes have piled up, replaces them and the previous
+        summary of this match with a summary of the whole match so far, computed from the histories.
+        """
+        stream = genagent.memory_stream
+        observations = [node for node in stream.seq_nodes if OBSERVATION.match(node.content)]
+        if len(observations) < self.every:
+            return None
+        before = len(stream.seq_nodes)
+        removed = {node.node_id for node in observations}
+        removed.update(node.node_id for node in stream.seq_nodes if CURRENT.match(node.content))
+        time_step = max(node.created for node in observations)
+        summary = MatchSummary.from_history(opponent, opponent_history, own_history, in_progress=True)
+        genagent.remember(summary.content(), time_step=time_step)
+        self._remove(stream, removed)
+        return {"before": before, "after": len(stream.seq_nodes), "removed": before - len(stream.seq_nodes)}
+
+    def compact_match(self, genagent, opponent: str, own_history: Optional[Sequence] = None,
+                      opponent_history: Optional[Sequence] = None) -> Dict[str, int]:
+        """
+        Run after each match: summarises its observation nodes, then merges the opponent's old summaries.
+        Pass the histories if compact_turns() ran during the match; otherwise the opponent's moves are
+        read back from the observation nodes.
+        """
+        stream = genagent.memory_stream
+        observations = [node for node in stream.seq_nodes if OBSERVATION.match(node.content)]
+        current = [node for node in stream.seq_nodes if CURRENT.match(node.content)]
+        if opponent_history is None:
+            opponent_history = ["C" if OBSERVATION.match(n.content).group(1) == "cooperated" else "D" for n in observations]
+        before = len(stream.seq_nodes)
+        if not observations and not current and not opponent_history:
+            return {"before": before, "after": before, "removed": 0}
+
+        time_step = max((node.created for node in observations + current), default=0)
+        removed = {node.node_id for node in observations + current}
+        genagent.remember(MatchSummary.from_history(opponent, opponent_history, own_history).content(), time_step=time_step)
+
+        summaries = [(node, MatchSummary.parse(node.content)) for node in stream.seq_nodes]
+        summaries = [(node, s) for node, s in summaries if s is not None and s.opponent == opponent]
+        if len(summaries) > self.keep_recent + 1:
+            old = summaries[:len(summaries) - self.keep_recent]
+            removed.update(node.node_id for node, _ in old)
+            genagent.remember(MatchSummary.merge([s for _, s in old]).content(), time_step=time_step)
+            # The running summary goes before the recent ones, so the newest match stays last
+            merged = stream.seq_nodes.pop()
+            stream.seq_nodes.insert(stream.seq_nodes.index(summaries[-self.keep_recent][0]), merged)
+
+        self._remove(stream, removed)
+        after = len(stream.seq_nodes)
+        logging.info(f"Compacted memory stream after match vs {opponent}: {before} -> {after} nodes")
+        return {"before": before, "after": after, "removed": before - after}
+
+    @staticmethod
+    def _remove(stream, node_ids: set):
+        """Drops nodes and renumbers the rest 0..n-1, remapping pointer ids and unused embeddings."""
+        kept = [node for node in stream.seq_nodes if node.node_id not in node_ids]
+        new_ids = {node.node_id: i for i, node in enumerate(kept)}
+
+        def remap(pointer):
+            if isinstance(pointer, list):
+                return [new_ids[p] for p in pointer if p in new_ids]
+            return new_ids.get(pointer) if pointer is not None else None
+
+        for node in kept:
+            node.node_id = new_ids[node.node_id]
+            if getattr(node, "pointer_id", None) is not None:
+                node.pointer_id = remap(node.pointer_id)
+        stream.seq_nodes[:] = kept
+        stream.id_to_node.clear()
+        stream.id_to_node.update({node.node_id: node for node in kept})
+
+        embeddings = getattr(stream, "embeddings", None)
+        if embeddings:
+            contents = {node.content for node in kept}
+            for content in [c for c in embeddings if c not in contents]:
+                del embeddings[content]
@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+import Tracing
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends stay atomic within one process only
+    fcntl = None
+
+LOG_NAME = "nodes.log.jsonl"
+NODES_NAME = "nodes.json"
+
+
+class MemoryStreamStore:
+    """
+    Append-only storage for an agent's memory stream.
+
+    New nodes are appended as JSON lines to memory_stream/nodes.log.jsonl next to the nodes.json
+    genagents reads. Appends are O(1): the next node id and each node's byte offset are kept in
+    memory, and only new log bytes are ever read. compact() folds the log back into nodes.json.
+    A torn last line (a crash mid-append, or another process's append in flight) is not indexed;
+    it is truncated only by a writer holding the log lock, where it can only be a crash's leftover.
+    Log entries already present in nodes.json (a crash between compaction's rename and truncate)
+    are skipped.
+    """
+
+    def __init__(self, memory_stream_dir: str, compact_every: Optional[int] = None, fsync: bool = False):
+        self.memory_stream_dir = memory_stream_dir
+        self.nodes_path = os.path.join(memory_stream_dir, NODES_NAME)
+        self.log_path = os.path.join(memory_stream_dir, LOG_NAME)
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._base_count = 0
+        self._base_max_id = -1
+        self._next_id = 0
+        self._offsets: Dict[int, int] = {}  # node_id -> byte offset of its line in the log
+        self._log_size = 0                  # bytes of the log already indexed
+        self._base_mtime = None
+        os.makedirs(memory_stream_dir, exist_ok=True)
+        self._recover()
+
+    @classmethod
+    def for_agent(cls, agent_folder: str, **kwargs) -> "MemoryStreamStore":
+        return cls(os.path.join(agent_folder, "memory_stream"), **kwargs)
+
+    # --- Loading and recovery ---
+    def _read_base(self) -> List[dict]:
+        if not os.path.exists(self.nodes_path):
+            return []
+        with open(self.nodes_path, "r") as f:
+            nodes = json.load(f)
+        return nodes if isinstance(nodes, list) else [nodes]
+
+    def _base_changed(self) -> bool:
+        mtime = os.stat(self.nodes_path).st_mtime_ns if os.path.exists(self.nodes_path) else None
+        return mtime != self._base_mtime
+
+    def _recover(self):
+        self._base_mtime = os.stat(self.nodes_path).st_mtime_ns if os.path.exists(self.nodes_path) else None
+        base = self._read_base()
+        self._base_count = len(base)
+        self._base_max_id = max((node.get("node_id", 0) for node in base), default=-1)
+        self._next_id = self._base_max_id + 1
+        self._offsets = {}
+        self._log_size = 0
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, "rb") as f:
+            self._index_from(f)
+
+    def _index_from(self, f, truncate_torn: bool = False):
+        """Indexes log lines written since the last call (by this or another process)."""
+        f.seek(self._log_size)
+        offset = self._log_size
+        for line in f:
+            if not line.endswith(b"\n"):
+                # Under the lock no append is in flight, so this is a crash's torn write: drop it so
+                # the next append starts on a clean line. Without the lock it may be a live append.
+                if truncate_torn:
+                    logging.warning(f"Truncating torn record at byte {offset} of {self.log_path}")
+                    f.truncate(offset)
+                break
+            try:
+                node_id = json.loads(line)["node_id"]
+            except (ValueError, KeyError):
+                logging.warning(f"Skipping corrupt record at byte {offset} of {self.log_path}")
+                offset += len(line)
+                continue
+            if node_id > self._base_max_id:
+                self._offsets[node_id] = offset
+                self._next_id = max(self._next_id, node_id + 1)
+            offset += len(line)
+        self._log_size = offset
+
+    def _locked_log(self):
+        f = open(self.log_path, "ab+")
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        return f
+
+    def _sync(self, f):
+        """Under the log lock: catches up with nodes appended or compacted by other processes."""
+        # If nodes.json was compacted by another process, our index is stale
+        if self._base_changed() or self._log_size > os.fstat(f.fileno()).st_size:
+            self._recover()
+        self._index_from(f, truncate_torn=True)
+
+    # --- Writing ---
+    def append(self, node: dict) -> int:
+        """Appends one node, assigning it the next node_id, and returns that id."""
+        return self.append_many([node])[0]
+
+    def append_many(self, nodes: List[dict]) -> List[int]:
+        """Appends several nodes in a single write and returns their node ids."""
+        start = time.perf_counter()
+        with self._lock:
+            with self._locked_log() as f:
+                self._sync(f)
+                ids, lines = [], []
+                for node in nodes:
+                    record = dict(node, node_id=self._next_id)
+                    ids.append(self._next_id)
+                    lines.append(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+                    self._next_id += 1
+                f.seek(0, os.SEEK_END)
+                f.write(b"".join(lines))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+                offset = self._log_size
+                for node_id, line in zip(ids, lines):
+                    self._offsets[node_id] = offset
+                    offset += len(line)
+                self._log_size = offset
+            Tracing.current().add("io_s", time.perf_counter() - start)
+            if self.compact_every and len(self._offsets) >= self.compact_every:
+                self.compact()
+        return ids
+
+    def compact(self):
+        """Rewrites nodes.json with every node (the layout genagents expects) and empties the log."""
+        start = time.perf_counter()
+        with self._lock:
+            with self._locked_log() as f:
+                self._sync(f)
+                nodes = self.nodes()
+                tmp_path = f"{self.nodes_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as out:
+                    json.dump(nodes, out, indent=2)
+                    out.flush()
+                    os.fsync(out.fileno())
+                os.replace(tmp_path, self.nodes_path)
+                f.truncate(0)
+            self._recover()
+        Tracing.current().add("io_s", time.perf_counter() - start)
+        logging.info(f"Compacted {len(nodes)} nodes into {self.nodes_path}")
+
+    # --- Reading ---
+    def get(self, node_id: int) -> Optional[dict]:
+        """Reads a node by id, seeking straight to its log record when it has not been compacted yet."""
+        if node_id in self._offsets:
+            with open(self.log_path, "rb") as f:
+                f.seek(self._offsets[node_id])
+                return json.loads(f.readline())
+        return next((node for node in self._read_base() if node.get("node_id") == node_id), None)
+
+    def nodes(self) -> List[dict]:
+        """All nodes, compacted and pending, in node_id order of appending."""
+        with self._lock:
+            nodes = self._read_base()
+            if self._offsets:
+                with open(self.log_path, "rb") as f:
+                    for node_id in sorted(self._offsets):
+                        f.seek(self._offsets[node_id])
+                        nodes.append(json.loads(f.readline()))
+            return nodes
+
+    @property
+    def next_id(self) -> int:
+        return self._next_id
+
+    @property
+    def pending(self) -> int:
+        """Number of nodes in the log that are not yet in nodes.json."""
+        return len(self._offsets)
+
+    def __len__(self):
+        return self._base_count + len(self._offsets)
@@ -0,0 +1,237 @@
+import os
+import json
+import uuid
+import random
+import shutil
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+from LLMBackend import get_client
+from LLMCache import sample_key
+from Genome import genome_hash
+from RateLimiter import RateLimiter, retry_with_backoff
+from MemoryStreamStore import MemoryStreamStore
+import Tracing
+
+MUTATION_MODEL = "gpt-4o"
+
+
+class TraitAdjustment(BaseModel):
+    node_id: int
+    node_type: str = "trait_adjustment"
+    content: str
+    importance: int = 85
+    created: int
+    last_retrieved: int
+    pointer_id: None
+
+
+def trait_messages(fitness: Optional[float] = None) -> List[dict]:
+    """Prompt asking the strategy coach for one trait adjustment."""
+    #These traits are chosen based on the paper Strategies for the Iterated Prisoner’s Dilemma Anagh Malik 2021
+    prompt = (
+        "Analyze the agent's IPD strategy and suggest a trait adjustment to maximize points. The point is to win at any cost "
+        "Focus on one of: Nice (cooperation), Retaliatory (punishment), "
+        "Forgiving (reconciliation), Clear (consistency). "
+        "Format: 'Trait: adjustment direction with strategic reasoning'"
+    )
+    if fitness is not None:
+        prompt += f" The agent's average score per match in the last generation was {fitness:.2f}."
+    return [
+        {"role": "system", "content": "You are a strategy coach for game-theoretic agents."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def clone_agent(population_dir: str, parent_id: str, child_id: Optional[str] = None) -> str:
+    """Copies a parent's folder (with its compacted memory stream) to child_id (a new id by default)."""
+    parent_folder = os.path.join(population_dir, parent_id)
+    store = MemoryStreamStore.for_agent(parent_folder)
+    if store.pending:
+        store.compact()
+    child_id = child_id or str(uuid.uuid4())
+    shutil.copytree(parent_folder, os.path.join(population_dir, child_id))
+    return child_id
+
+
+class MutationPhase:
+    """
+    Generation-level mutation: one TraitAdjustment per selected agent, requested as a single
+    concurrent batch (or through an offline batch file) and applied to the memory streams in bulk.
+    Each selected agent is mutated with probability mutation_rate.
+    With a PopulationManifest, mutated agents and offspring are indexed with their new content hash,
+    and a run repeated for the same generation skips the agents it already mutated.
+    """
+
+    def __init__(self, population_dir: str, client=None, mutation_rate: float = 1.0, concurrency: int = 8,
+                 requests_per_minute: Optional[int] = None, max_retries: int = 3, seed: Optional[int] = None,
+                 manifest=None):
+        self.population_dir = population_dir
+        self.manifest = manifest
+        # Resolved on first request, so a parent that forks evaluation workers has not built one yet
+        self._client = client
+        self.mutation_rate = mutation_rate
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(requests_per_minute=requests_per_minute) if requests_per_minute else None
+        self.max_retries = max_retries
+        self.rng = random.Random(seed)
+
+    @property
+    def client(self):
+        return self._client if self._client is not None else get_client()
+
+    def select(self, agent_ids: List[str]) -> List[str]:
+        """Agents that will receive a mutation this generation."""
+        return [agent_id for agent_id in agent_ids if self.rng.random() < self.mutation_rate]
+
+    def build_requests(self, agent_ids: List[str], fitness: Optional[Dict[str, float]] = None) -> Dict[str, dict]:
+        """chat.completions.create arguments for every agent, keyed by agent id."""
+        fitness = fitness or {}
+        return {
+            agent_id: dict(model=MUTATION_MODEL, response_model=TraitAdjustment,
+                           messages=trait_messages(fitness.get(agent_id)))
+            for agent_id in agent_ids
+        }
+
+    def sample_keys(self, agent_ids: List[str], generation: Optional[int] = None) -> Dict[str, str]:
+        """
+        LLM cache key part per agent: the trait prompt is the same for every agent, so requests are told
+        apart by generation and genome, and clones sharing a genome by their order in the batch.
+        Unlike agent ids (random for offspring), these keys are the same when a run is replayed.
+        """
+        seen = Counter()
+        keys = {}
+        for agent_id in agent_ids:
+            genome = genome_hash(os.path.join(self.population_dir, agent_id))
+            keys[agent_id] = f"mutation-{generation}-{genome}-{seen[genome]}"
+            seen[genome] += 1
+        return keys
+
+    def request_all(self, requests: Dict[str, dict], generation: Optional[int] = None) -> Dict[str, TraitAdjustment]:
+        """Sends every request concurrently; agents whose request fails are left out."""
+        samples = self.sample_keys(list(requests), generation)
+
+        def call(agent_id, kwargs):
+            def attempt():
+                if self.limiter is not None:
+                    self.limiter.acquire()
+                return self.client.chat.completions.create(**kwargs)
+            with Tracing.span("llm", kind="mutation", agent_id=agent_id) as span, sample_key(samples[agent_id]):
+                response = retry_with_backoff(attempt, max_retries=self.max_retries, description="Trait adjustment")
+                span.record_usage(response)
+                return response
+
+        adjustments = {}
+        with ThreadPoolExecutor(max_workers=max(1, self.concurrency)) as executor:
+            futures = {executor.submit(Tracing.in_context(call), agent_id, kwargs): agent_id
+                       for agent_id, kwargs in requests.items()}
+            for future in as_completed(futures):
+                agent_id = futures[future]
+                try:
+                    adjustments[agent_id] = future.result()
+                except Exception as e:
+                    logging.error(f"Trait adjustment for agent {agent_id} failed: {e}")
+        return adjustments
+
+    def apply(self, adjustments: Dict[str, TraitAdjustment]) -> Dict[str, int]:
+        """Appends each agent's adjustment node to its memory stream and compacts it into nodes.json."""
+        node_ids = {}
+        for agent_id, adjustment in adjustments.items():
+            store = MemoryStreamStore.for_agent(os.path.join(self.population_dir, agent_id))
+            node_ids[agent_id] = store.append(adjustment.model_dump())
+            store.compact()
+        logging.info(f"Applied {len(node_ids)} trait adjustment nodes")
+        return node_ids
+
+    def run(self, parent_ids: List[str], fitness: Optional[Dict[str, float]] = None,
+            spawn_offspring: bool = False, generation: Optional[int] = None) -> Dict[str, int]:
+        """
+        Mutates the selected parents (or fresh clones of them when spawn_offspring is set; a parent
+        listed several times gets that many clones). Returns the new node id per mutated agent id.
+        """
+        with Tracing.span("mutation_phase", agents=len(parent_ids), generation=generation):
+            return self._run(parent_ids, fitness, spawn_offspring, generation)
+
+    def _run(self, parent_ids: List[str], fitness: Optional[Dict[str, float]], spawn_offspring: bool,
+             generation: Optional[int]) -> Dict[str, int]:
+        done = self._already_mutated(generation, spawn_offspring)
+        if done:
+            logging.info(f"Resuming generation {generation}: {sum(done.values())} agents already mutated")
+        selected = []
+        for agent_id in self.select(parent_ids):
+            # A parent listed n times spawns n offspring; those already in the manifest are not spawned again
+            if done[agent_id]:
+                done[agent_id] -= 1
+            else:
+                selected.append(agent_id)
+        fitness = fitness or {}
+        children = {}
+        if spawn_offspring:
+            children = {str(uuid.uuid4()): parent_id for parent_id in selected}
+            if self.manifest is not None:
+                # Reserved first: a crash mid-clone must not leave a folder that rebuild() takes for a base agent
+                self.manifest.reserve({child_id: [parent_id] for child_id, parent_id in children.items()})
+            for child_id, parent_id in children.items():
+                clone_agent(self.population_dir, parent_id, child_id)
+            fitness = {child_id: fitness.get(parent_id) for child_id, parent_id in children.items()}
+            selected = list(children)
+        logging.info(f"Mutating {len(selected)} of {len(parent_ids)} agents (rate {self.mutation_rate})")
+        node_ids = self.apply(self.request_all(self.build_requests(selected, fitness), generation))
+        if self.manifest is not None:
+            self._index(node_ids, children, generation)
+        return node_ids
+
+    def _already_mutated(self, generation: Optional[int], spawn_offspring: bool) -> Counter:
+        """
+        Agents the manifest records as mutated in this generation or, with offspring, how many
+        mutated offspring each parent has.
+        """
+        if self.manifest is None or generation is None:
+            return Counter()
+        mutated = [entry for entry in self.manifest.filter() if entry.get("mutated_generation") == generation]
+        if spawn_offspring:
+            return Counter(parent for entry in mutated for parent in entry["parents"])
+        return Counter(entry["agent_id"] for entry in mutated)
+
+    def _index(self, node_ids: Dict[str, int], children: Dict[str, str], generation: Optional[int]):
+        for child_id, parent_id in children.items():
+            parent = self.manifest.get(parent_id)
+            child_generation = parent["generation"] + 1 if parent is not None else (generation or 0) + 1
+            fields = {"mutated_generation": generation} if child_id in node_ids else {}
+            self.manifest.register(child_id, generation=child_generation, parents=[parent_id], **fields)
+        mutated = [agent_id for agent_id in node_ids if agent_id not in children]
+        if mutated:
+            self.manifest.refresh(mutated, mutated_generation=generation)
+
+    # --- Offline batch interface (OpenAI Batch API JSONL) ---
+    def write_batch_file(self, agent_ids: List[str], path: str, fitness: Optional[Dict[str, float]] = None):
+        """Writes one /v1/chat/completions request per agent, with custom_id set to the agent id."""
+        schema = TraitAdjustment.model_json_schema()
+        with open(path, 'w') as f:
+            for agent_id, kwargs in self.build_requests(agent_ids, fitness).items():
+                body = {
+                    "model": kwargs["model"],
+                    "messages": kwargs["messages"],
+                    "response_format": {"type": "json_schema",
+                                        "json_schema": {"name": "TraitAdjustment", "schema": schema}},
+                }
+                f.write(json.dumps({"custom_id": agent_id, "method": "POST",
+                                    "url": "/v1/chat/completions", "body": body}) + "\n")
+        logging.info(f"Wrote {len(agent_ids)} trait adjustment requests to {path}")
+
+    def read_batch_results(self, path: str) -> Dict[str, TraitAdjustment]:
+        """Parses a batch output file back into adjustments; failed or invalid lines are skipped."""
+        adjustments = {}
+        with open(path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                try:
+                    content = record["response"]["body"]["choices"][0]["message"]["content"]
+                    adjustments[record["custom_id"]] = TraitAdjustment.model_validate_json(content)
+                except Exception as e:
+                    logging.error(f"Skipping batch result for {record.get('custom_id')}: {e}")
+        return adjustments
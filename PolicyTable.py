@@ -0,0 +1,134 @@
+import os
+import json
+import contextvars
+import logging
+import threading
+from itertools import product
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+COOPERATE = "C"
+DEFECT = "D"
+
+
+def _moves(history, k: int) -> str:
+    """Last k moves of a history as a string such as 'CDC' (works with axelrod Actions or strings)."""
+    recent = list(history)[-k:] if k > 0 else []
+    return "".join(str(move) for move in recent)
+
+
+def state_key(own_history, opponent_history, k: int) -> str:
+    """Policy state for the last k moves of both players, e.g. 'CCD:DCC'."""
+    return f"{_moves(own_history, k)}:{_moves(opponent_history, k)}"
+
+
+def all_states(k: int) -> Iterator[Tuple[str, str]]:
+    """Every (own, opponent) recent-history pair of length 0..k, i.e. all states reachable in a match."""
+    for length in range(k + 1):
+        for own in product(COOPERATE + DEFECT, repeat=length):
+            for opponent in product(COOPERATE + DEFECT, repeat=length):
+                yield "".join(own), "".join(opponent)
+
+
+def policy_question(own: str, opponent: str) -> str:
+    """Decision question describing a recent-history state in words."""
+    if not own:
+        return "This is the first round against a new opponent. Should I cooperate with my opponent?"
+    describe = lambda moves: ", ".join("cooperated" if m == COOPERATE else "defected" for m in moves)
+    return (f"In the last {len(own)} rounds (oldest first) I {describe(own)}, "
+            f"and my opponent {describe(opponent)}. Should I cooperate with my opponent?")
+
+
+def parse_decision(response) -> Optional[str]:
+    """Maps a categorical_resp 'Yes'/'No' answer to 'C'/'D'; None if the answer is unusable."""
+    if isinstance(response, str):
+        return COOPERATE if response.strip().lower() == "yes" else DEFECT
+    return None
+
+
+class PolicyTable:
+    """
+    Memoized decisions of one agent genome, keyed on the last k moves of both players.
+    A decision is computed once per state and reused across turns, matches and opponents.
+    """
+
+    def __init__(self, genome: str, k: int = 3, path: Optional[str] = None):
+        self.genome = genome
+        self.k = k
+        self.path = path
+        self.table: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+
+    @classmethod
+    def for_genome(cls, policy_dir: str, genome: str, k: int = 3) -> "PolicyTable":
+        """Opens (or starts) the table stored for a genome under policy_dir."""
+        os.makedirs(policy_dir, exist_ok=True)
+        return cls(genome, k=k, path=os.path.join(policy_dir, f"{genome}_k{k}.json"))
+
+    def lookup(self, own_history, opponent_history) -> Optional[str]:
+        action = self.table.get(state_key(own_history, opponent_history, self.k))
+        if action is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return action
+
+    def record(self, own_history, opponent_history, action: str, save: bool = True):
+        with self._lock:
+            self.table[state_key(own_history, opponent_history, self.k)] = action
+        if save:
+            self.save()
+
+    def is_complete(self) -> bool:
+        return all(f"{own}:{opponent}" in self.table for own, opponent in all_states(self.k))
+
+    def load(self):
+        with open(self.path, "r") as f:
+            data = json.load(f)
+        if data.get("genome") != self.genome or data.get("k") != self.k:
+            logging.warning(f"Ignoring policy table {self.path}: it belongs to a different genome or memory depth")
+            return
+        self.table = data["table"]
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {"genome": self.genome, "k": self.k, "table": dict(self.table)}
+            tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def distill(self, categorical_resp, batch_size: int = 10, concurrency: int = 4):
+        """
+        Fills every missing state up front. States are asked `batch_size` at a time in a single
+        categorical_resp call, with `concurrency` calls in flight. Pass GenAgentPlayer.categorical_resp
+        (see GenAgentPlayer.distill_policy) so the calls go through the LLM cache and tracing.
+        """
+        missing = [(own, opponent) for own, opponent in all_states(self.k) if f"{own}:{opponent}" not in self.table]
+        batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+        logging.info(f"Distilling {len(missing)} policy states for genome {self.genome[:12]} in {len(batches)} batches")
+
+        def ask(batch: List[Tuple[str, str]]):
+            questions = {policy_question(own, opponent): ["Yes", "No"] for own, opponent in batch}
+            response = categorical_resp(questions)
+            answers = response.get("responses", []) if isinstance(response, dict) else []
+            for (own, opponent), answer in zip(batch, answers):
+                action = parse_decision(answer)
+                if action is not None:
+                    self.record(own, opponent, action, save=False)
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            # Each batch runs in a copy of this context, so it keeps the sample key and the parent span
+            for future in [executor.submit(contextvars.copy_context().run, ask, batch) for batch in batches]:
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.error(f"Policy distillation batch failed: {e}")
+        self.save()
+        return self
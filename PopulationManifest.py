@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from Genome import genome_hash
+from MemoryStreamStore import MemoryStreamStore
+
+try:
+    import fcntl
+except ImportError:  # Windows: updates are atomic but only serialised within one process
+    fcntl = None
+
+MANIFEST_NAME = "manifest.json"
+
+
+class PopulationManifest:
+    """
+    Index of a population directory: one entry per agent with its generation, parent ids, content
+    hash, node count and fitness, plus named checkpoints for resuming interrupted runs. Agents being
+    created (e.g. offspring being cloned) are reserved first, so a folder left by a crash before
+    its registration is never mistaken for a base-population agent by rebuild().
+
+    Every update takes a file lock, re-reads the manifest, applies the change and atomically
+    replaces the file, so concurrent writers and crashes never leave a partial manifest.
+    Lookups and filters read only the manifest, never the agents' memory files.
+    """
+
+    def __init__(self, population_dir: str):
+        self.population_dir = population_dir
+        self.path = os.path.join(population_dir, MANIFEST_NAME)
+        self._lock = threading.RLock()
+        os.makedirs(population_dir, exist_ok=True)
+        self.data = self._read()
+
+    def _read(self) -> dict:
+        if not os.path.exists(self.path):
+            return {"agents": {}, "pending": {}, "checkpoints": {}}
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def _write(self):
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    @contextmanager
+    def update(self):
+        """Locks, reloads and yields the manifest data; the changes are saved atomically on exit."""
+        with self._lock:
+            with open(f"{self.path}.lock", "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self.data = self._read()
+                yield self.data
+                self._write()
+
+    # --- Agents ---
+    def __contains__(self, agent_id: str) -> bool:
+        return agent_id in self.data["agents"]
+
+    def __len__(self):
+        return len(self.data["agents"])
+
+    def get(self, agent_id: str) -> Optional[dict]:
+        return self.data["agents"].get(agent_id)
+
+    def agent_ids(self, include_retired: bool = False) -> List[str]:
+        """Ids of the population's agents; retired ones only with include_retired."""
+        return sorted(agent_id for agent_id, entry in self.data["agents"].items()
+                      if include_retired or entry["retired_generation"] is None)
+
+    def _describe(self, agent_id: str) -> dict:
+        agent_folder = os.path.join(self.population_dir, agent_id)
+        return {"content_hash": genome_hash(agent_folder),
+                "node_count": len(MemoryStreamStore.for_agent(agent_folder))}
+
+    def reserve(self, parents: Dict[str, List[str]]):
+        """Records agents about to be created, by agent id with their parent ids, before their folders are written."""
+        with self.update() as data:
+            for agent_id, parent_ids in parents.items():
+                data["pending"][agent_id] = {"parents": parent_ids, "created": time.time()}
+
+    def register(self, agent_id: str, generation: int = 0, parents: Optional[List[str]] = None, **fields):
+        """Adds an agent whose folder has been fully written; extra fields are stored on its entry."""
+        entry = {"agent_id": agent_id, "generation": generation, "parents": parents or [],
+                 "fitness": None, "fitness_generation": None, "retired_generation": None, "created": time.time(),
+                 **self._describe(agent_id), **fields}
+        with self.update() as data:
+            data["agents"][agent_id] = entry
+            data["pending"].pop(agent_id, None)
+
+    def refresh(self, agent_ids: List[str], **fields):
+        """Recomputes content hash and node count after agents' memory streams changed (e.g. mutation)."""
+        described = {agent_id: {**self._describe(agent_id), **fields} for agent_id in agent_ids}
+        with self.update() as data:
+            for agent_id, entry_fields in described.items():
+                if agent_id in data["agents"]:
+                    data["agents"][agent_id].update(entry_fields)
+
+    def set_fitness(self, fitness: Dict[str, float], generation: int, config: Optional[str] = None,
+                    genomes: Optional[Dict[str, str]] = None):
+        """Records fitness with the match configuration key and genome hash it was measured for."""
+        genomes = genomes or {}
+        with self.update() as data:
+            for agent_id, value in fitness.items():
+                if agent_id in data["agents"]:
+                    data["agents"][agent_id].update(fitness=value, fitness_generation=generation, fitness_config=config,
+                                                    fitness_genome=genomes.get(agent_id))
+
+    def retire(self, agent_ids: List[str], generation: int):
+        """Marks agents as having left the population in `generation`; they stay indexed for lineage queries."""
+        with self.update() as data:
+            for agent_id in agent_ids:
+                if agent_id in data["agents"]:
+                    data["agents"][agent_id]["retired_generation"] = generation
+
+    def remove(self, agent_ids: List[str]):
+        """Drops agents from the index (e.g. culled by selection); their folders are left on disk."""
+        with self.update() as data:
+            for agent_id in agent_ids:
+                data["agents"].pop(agent_id, None)
+
+    def filter(self, generation: Optional[int] = None, min_fitness: Optional[float] = None,
+               evaluated: Optional[bool] = None) -> List[dict]:
+        """Entries matching every given condition."""
+        entries = []
+        for entry in self.data["agents"].values():
+            if generation is not None and entry["generation"] != generation:
+                continue
+            if evaluated is not None and (entry["fitness"] is not None) != evaluated:
+                continue
+            if min_fitness is not None and (entry["fitness"] is None or entry["fitness"] < min_fitness):
+                continue
+            entries.append(entry)
+        return entries
+
+    # --- Checkpoints ---
+    def checkpoint(self, key: str, value):
+        with self.update() as data:
+            data["checkpoints"][key] = value
+
+    def get_checkpoint(self, key: str, default=None):
+        return self.data["checkpoints"].get(key, default)
+
+    def rebuild(self):
+        """
+        Indexes agent folders missing from the manifest (e.g. a population created before manifests)
+        as generation-0 agents. Reserved agents whose creation was interrupted, and folders holding
+        the same memory stream as an indexed agent (an unregistered clone), are skipped with a warning.
+        """
+        missing = [
+            name for name in sorted(os.listdir(self.population_dir))
+            if name not in self.data["agents"]
+            and os.path.exists(os.path.join(self.population_dir, name, "memory_stream", "nodes.json"))
+        ]
+        known = {entry["content_hash"]: agent_id for agent_id, entry in self.data["agents"].items()}
+        indexed = 0
+        for agent_id in missing:
+            if agent_id in self.data["pending"]:
+                logging.warning(f"Skipping {agent_id}: its creation was interrupted before it was registered")
+                continue
+            genome = genome_hash(os.path.join(self.population_dir, agent_id))
+            if genome in known:
+                logging.warning(f"Skipping {agent_id}: it is an unregistered clone of {known[genome]}")
+                continue
+            self.register(agent_id)
+            known[genome] = agent_id
+            indexed += 1
+        if indexed:
+            logging.info(f"Indexed {indexed} existing agents in {self.path}")
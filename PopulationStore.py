@@ -0,0 +1,216 @@
+import os
+import json
+import mmap
+import logging
+from array import array
+from typing import Dict, List, Optional
+
+INTERVIEW_PREFIX = "Interviewer: "
+NO_POINTER = -1
+POINTER_LIST = -2  # pointer_id is a list (genagents reflection nodes), stored in pointer_values
+NO_QUESTION = -1
+HEADER_NAME = "population.json"
+COLUMNS = ("agent_offsets", "node_id", "importance", "created", "last_retrieved", "pointer_id",
+           "pointer_offsets", "pointer_values", "node_type", "question", "content_offsets")
+CONTENT_NAME = "content.bin"
+INT_FIELDS = ("node_id", "importance", "created", "last_retrieved")
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def split_content(content: str):
+    """Splits 'Interviewer: <question>\\n\\n<answer>' into (question, answer); (None, content) otherwise."""
+    if content.startswith(INTERVIEW_PREFIX) and "\n\n" in content:
+        question, answer = content[len(INTERVIEW_PREFIX):].split("\n\n", 1)
+        return question, answer
+    return None, content
+
+
+class PopulationStore:
+    """
+    Columnar in-memory store for the memory streams of a whole population.
+
+    Every node of every agent lives in a handful of flat integer arrays (node_id, importance,
+    created, last_retrieved, pointer_id), node types and interview questions are interned into
+    small string tables, and the remaining content text is one packed UTF-8 buffer addressed by
+    offsets. List pointer ids (reflection nodes) are kept in a pointer_offsets/pointer_values pair.
+    Saved stores can be memory-mapped so content is only paged in when read.
+    Converting to and from the nodes.json layout is lossless for nodes with integer fields and a
+    pointer_id that is None, an int or a list of ints; other nodes are rejected with a ValueError.
+    """
+
+    def __init__(self):
+        self.agent_ids: List[str] = []
+        self._agent_index: Dict[str, int] = {}
+        self.agent_offsets = array("q", [0])  # nodes of agent i are rows agent_offsets[i]:agent_offsets[i+1]
+        self.node_id = array("q")
+        self.importance = array("q")
+        self.created = array("q")
+        self.last_retrieved = array("q")
+        self.pointer_id = array("q")          # a node id, NO_POINTER or POINTER_LIST
+        self.pointer_offsets = array("q", [0])  # list pointer ids of row i are pointer_values[offsets[i]:offsets[i+1]]
+        self.pointer_values = array("q")
+        self.node_type = array("i")           # index into node_types
+        self.question = array("i")            # index into questions, or NO_QUESTION
+        self.content_offsets = array("q", [0])
+        self.node_types: List[str] = []
+        self.questions: List[str] = []
+        self._node_type_index: Dict[str, int] = {}
+        self._question_index: Dict[str, int] = {}
+        self._content = bytearray()
+        self._mmap = None
+
+    # --- Building ---
+    @staticmethod
+    def _intern(value: str, table: List[str], index: Dict[str, int]) -> int:
+        if value not in index:
+            index[value] = len(table)
+            table.append(value)
+        return index[value]
+
+    @staticmethod
+    def _validate(agent_id: str, node: dict):
+        """Raises a ValueError for a node the columns cannot hold exactly."""
+        def invalid(reason):
+            return ValueError(f"Agent {agent_id} node {node.get('node_id')!r}: {reason}")
+        for field in INT_FIELDS:
+            if not _is_int(node.get(field)):
+                raise invalid(f"{field} must be an int, got {node.get(field)!r}")
+        if not isinstance(node.get("content"), str) or not isinstance(node.get("node_type", "observation"), str):
+            raise invalid("content and node_type must be strings")
+        pointer = node.get("pointer_id")
+        if not (pointer is None or (_is_int(pointer) and pointer >= 0)
+                or (isinstance(pointer, list) and all(_is_int(p) for p in pointer))):
+            raise invalid(f"pointer_id must be None, a node id or a list of node ids, got {pointer!r}")
+
+    def add_agent(self, agent_id: str, nodes: List[dict]):
+        """Appends one agent's nodes (in the nodes.json layout); every node is validated before any is added."""
+        if self._mmap is not None:
+            raise ValueError("A memory-mapped store is read-only")
+        for node in nodes:
+            self._validate(agent_id, node)
+        for node in nodes:
+            question, text = split_content(node["content"])
+            self.node_id.append(node["node_id"])
+            self.importance.append(node["importance"])
+            self.created.append(node["created"])
+            self.last_retrieved.append(node["last_retrieved"])
+            pointer = node.get("pointer_id")
+            if isinstance(pointer, list):
+                self.pointer_id.append(POINTER_LIST)
+                self.pointer_values.extend(pointer)
+            else:
+                self.pointer_id.append(NO_POINTER if pointer is None else pointer)
+            self.pointer_offsets.append(len(self.pointer_values))
+            self.node_type.append(self._intern(node.get("node_type", "observation"), self.node_types, self._node_type_index))
+            self.question.append(NO_QUESTION if question is None
+                                 else self._intern(question, self.questions, self._question_index))
+            self._content += text.encode("utf-8")
+            self.content_offsets.append(len(self._content))
+        self._agent_index[agent_id] = len(self.agent_ids)
+        self.agent_ids.append(agent_id)
+        self.agent_offsets.append(len(self.node_id))
+
+    @classmethod
+    def from_population_dir(cls, population_dir: str) -> "PopulationStore":
+        """Loads every agent folder's memory_stream/nodes.json."""
+        store = cls()
+        for agent_id in sorted(os.listdir(population_dir)):
+            path = os.path.join(population_dir, agent_id, "memory_stream", "nodes.json")
+            if os.path.exists(path):
+                with open(path, "r") as f:
+                    store.add_agent(agent_id, json.load(f))
+        logging.info(f"Loaded {len(store.agent_ids)} agents ({len(store.node_id)} nodes) from {population_dir}")
+        return store
+
+    # --- Reading ---
+    def __len__(self):
+        return len(self.agent_ids)
+
+    def _content_bytes(self):
+        return self._mmap if self._mmap is not None else self._content
+
+    def node(self, row: int) -> dict:
+        """One node in the nodes.json layout."""
+        start, end = self.content_offsets[row], self.content_offsets[row + 1]
+        text = bytes(self._content_bytes()[start:end]).decode("utf-8")
+        question = self.question[row]
+        pointer = self.pointer_id[row]
+        if pointer == POINTER_LIST:
+            pointer = self.pointer_values[self.pointer_offsets[row]:self.pointer_offsets[row + 1]].tolist()
+        return {
+            "node_id": self.node_id[row],
+            "node_type": self.node_types[self.node_type[row]],
+            "content": text if question == NO_QUESTION else f"{INTERVIEW_PREFIX}{self.questions[question]}\n\n{text}",
+            "importance": self.importance[row],
+            "created": self.created[row],
+            "last_retrieved": self.last_retrieved[row],
+            "pointer_id": None if pointer == NO_POINTER else pointer,
+        }
+
+    def agent_rows(self, agent_id: str) -> range:
+        i = self._agent_index[agent_id]
+        return range(self.agent_offsets[i], self.agent_offsets[i + 1])
+
+    def agent_nodes(self, agent_id: str) -> List[dict]:
+        return [self.node(row) for row in self.agent_rows(agent_id)]
+
+    def count_nodes(self, agent_id: str, node_type: Optional[str] = None) -> int:
+        """Node count for an agent, optionally of one type, without materialising any node."""
+        rows = self.agent_rows(agent_id)
+        if node_type is None:
+            return len(rows)
+        if node_type not in self._node_type_index:
+            return 0
+        type_index = self._node_type_index[node_type]
+        return sum(1 for row in rows if self.node_type[row] == type_index)
+
+    def write_population_dir(self, population_dir: str):
+        """Writes every agent back out as memory_stream/nodes.json."""
+        for agent_id in self.agent_ids:
+            agent_dir = os.path.join(population_dir, agent_id, "memory_stream")
+            os.makedirs(agent_dir, exist_ok=True)
+            with open(os.path.join(agent_dir, "nodes.json"), "w") as f:
+                json.dump(self.agent_nodes(agent_id), f, indent=2)
+
+    # --- Columnar files ---
+    def save(self, path: str):
+        """Saves the store as raw column files plus a small JSON header."""
+        os.makedirs(path, exist_ok=True)
+        for name in COLUMNS:
+            with open(os.path.join(path, f"{name}.bin"), "wb") as f:
+                getattr(self, name).tofile(f)
+        with open(os.path.join(path, CONTENT_NAME), "wb") as f:
+            f.write(self._content_bytes())
+        header = {"agent_ids": self.agent_ids, "node_types": self.node_types, "questions": self.questions,
+                  "typecodes": {name: getattr(self, name).typecode for name in COLUMNS}}
+        with open(os.path.join(path, HEADER_NAME), "w") as f:
+            json.dump(header, f)
+
+    @classmethod
+    def load(cls, path: str, mmap_content: bool = True) -> "PopulationStore":
+        """Loads a saved store; with mmap_content the content buffer is memory-mapped instead of read."""
+        store = cls()
+        with open(os.path.join(path, HEADER_NAME), "r") as f:
+            header = json.load(f)
+        store.agent_ids = header["agent_ids"]
+        store._agent_index = {agent_id: i for i, agent_id in enumerate(store.agent_ids)}
+        store.node_types = header["node_types"]
+        store.questions = header["questions"]
+        store._node_type_index = {value: i for i, value in enumerate(store.node_types)}
+        store._question_index = {value: i for i, value in enumerate(store.questions)}
+        for name in COLUMNS:
+            column = array(header["typecodes"][name])
+            with open(os.path.join(path, f"{name}.bin"), "rb") as f:
+                column.frombytes(f.read())
+            setattr(store, name, column)
+        content_path = os.path.join(path, CONTENT_NAME)
+        if mmap_content and os.path.getsize(content_path) > 0:
+            with open(content_path, "rb") as f:
+                store._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            with open(content_path, "rb") as f:
+                store._content = bytearray(f.read())
+        return store
@@ -0,0 +1,87 @@
+import time
+import random
+import threading
+import logging
+from collections import deque
+from typing import Callable, Optional
+import Tracing
+
+# --- Errors worth retrying (rate limits, timeouts and transient server errors) ---
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {"RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError"}
+
+
+class RetryableError(Exception):
+    """Raised by callers for failures that are worth retrying, e.g. an incomplete structured answer."""
+
+
+def is_retryable(error: Exception) -> bool:
+    """Returns True if an LLM client error is transient and the call should be retried."""
+    if isinstance(error, RetryableError):
+        return True
+    status_code = getattr(error, "status_code", None)
+    if status_code is None and getattr(error, "response", None) is not None:
+        status_code = getattr(error.response, "status_code", None)
+    if status_code in RETRYABLE_STATUS_CODES:
+        return True
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+def backoff_delay(attempt: int, base_delay: float = 1.0, max_delay: float = 60.0) -> float:
+    """Full-jitter exponential backoff: a random delay in [0, min(max_delay, base_delay * 2**attempt)]."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def retry_with_backoff(fn: Callable, max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 60.0,
+                       description: str = "LLM call"):
+    """Calls fn(), retrying transient errors with jittered exponential backoff."""
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            Tracing.current().add("retries")
+            logging.warning(f"{description} failed ({e}); retry {attempt + 1}/{max_retries} in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+
+
+class RateLimiter:
+    """
+    Thread-safe sliding-window limiter for requests and tokens per minute.
+    Callers block in acquire() until both budgets have room for the next call.
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None,
+                 period: float = 60.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.period = period
+        self._events = deque()  # (timestamp, tokens) for every call in the current window
+        self._tokens_in_window = 0
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        while self._events and now - self._events[0][0] >= self.period:
+            _, tokens = self._events.popleft()
+            self._tokens_in_window -= tokens
+
+    def acquire(self, tokens: int = 0):
+        """Blocks until a call costing `tokens` fits in both the request and token budgets."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._expire(now)
+                requests_ok = self.requests_per_minute is None or len(self._events) < self.requests_per_minute
+                # A single call larger than the whole token budget is let through once the window is empty
+                tokens_ok = (self.tokens_per_minute is None or not self._events
+                             or self._tokens_in_window + tokens <= self.tokens_per_minute)
+                if requests_ok and tokens_ok:
+                    self._events.append((now, tokens))
+                    self._tokens_in_window += tokens
+                    return
+                wait = self._events[0][0] + self.period - now
+            time.sleep(max(wait, 0.01))
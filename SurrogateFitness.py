@@ -0,0 +1,220 @@
+import os
+import re
+import json
+import logging
+import threading
+import numpy as np
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from Genome import genome_hash
+from MemoryStreamStore import MemoryStreamStore
+from PolicyTable import COOPERATE, parse_decision, policy_question
+
+# --- Features ---
+TRAITS = ("Nice", "Retaliatory", "Forgiving", "Clear")
+INCREASE = re.compile(r"\b(increase|more|strengthen|raise|extend|longer|always|immediately)\b", re.IGNORECASE)
+DECREASE = re.compile(r"\b(decrease|less|reduce|weaken|lower|shorten|shorter|avoid|never)\b", re.IGNORECASE)
+
+# Recent-history states asked in one categorical_resp call when probing: (own, opponent), oldest first
+PROBE_STATES = [("", ""), ("C", "C"), ("C", "D"), ("D", "C"), ("D", "D"), ("CC", "DD")]
+
+FEATURE_NAMES = (
+    ["bias", "trait_adjustments", "parent_fitness", "has_parent_fitness"]
+    + [f"{trait.lower()}_{kind}" for trait in TRAITS for kind in ("count", "direction")]
+    + [f"probe_{own or '-'}_{opponent or '-'}" for own, opponent in PROBE_STATES]
+)
+
+
+def trait_direction(content: str) -> Tuple[Optional[str], int]:
+    """('Retaliatory', -1) for 'Retaliatory: decrease punishment length ...'; (None, 0) if no trait is named."""
+    head = content.split(":", 1)[0]
+    trait = next((t for t in TRAITS if t.lower() in head.lower()), None)
+    if trait is None:
+        trait = next((t for t in TRAITS if t.lower() in content.lower()), None)
+    if trait is None:
+        return None, 0
+    body = content.split(":", 1)[-1]
+    increase, decrease = INCREASE.search(body), DECREASE.search(body)
+    if increase and (not decrease or increase.start() < decrease.start()):
+        return trait, 1
+    if decrease:
+        return trait, -1
+    return trait, 0
+
+
+def features(nodes: Sequence[dict], parent_fitness: Optional[float] = None,
+             probes: Optional[Sequence[float]] = None) -> np.ndarray:
+    """Feature vector (in FEATURE_NAMES order) of a memory stream; unprobed states count as 0.5."""
+    adjustments = [node for node in nodes if node.get("node_type") == "trait_adjustment"]
+    counts = {trait: 0 for trait in TRAITS}
+    directions = {trait: 0 for trait in TRAITS}
+    for node in adjustments:
+        trait, direction = trait_direction(node.get("content", ""))
+        if trait is not None:
+            counts[trait] += 1
+            directions[trait] += direction
+    row = [1.0, len(adjustments), parent_fitness or 0.0, float(parent_fitness is not None)]
+    for trait in TRAITS:
+        row += [counts[trait], directions[trait]]
+    row += list(probes) if probes is not None else [0.5] * len(PROBE_STATES)
+    return np.array(row, dtype=np.float64)
+
+
+def probe_decisions(categorical_resp: Callable[[dict], dict]) -> List[float]:
+    """Cooperation (1.0) or defection (0.0) in each PROBE_STATES state, from a single categorical_resp call."""
+    questions = {policy_question(own, opponent): ["Yes", "No"] for own, opponent in PROBE_STATES}
+    try:
+        response = categorical_resp(questions)
+        answers = response.get("responses", []) if isinstance(response, dict) else []
+    except Exception as e:
+        logging.error(f"Probe decisions failed: {e}")
+        answers = []
+    decisions = [parse_decision(answer) for answer in answers]
+    decisions += [None] * (len(PROBE_STATES) - len(decisions))
+    return [0.5 if d is None else float(d == COOPERATE) for d in decisions[:len(PROBE_STATES)]]
+
+
+# ========== Model ==========
+class SurrogateFitness:
+    """
+    Ridge regression from memory-stream features to fitness, trained incrementally: each observed
+    (features, fitness) pair is folded into the running X'X and X'y sums, so retraining after a
+    generation costs one small solve regardless of how much history has accumulated. Genomes are
+    counted once. The sums are saved to `path` (JSON) so the model survives restarts.
+    Set probes when the rows come from agent_features with an agent_factory: a model trained with
+    probe answers and one trained on the constant 0.5 placeholders are not interchangeable, so a
+    saved model of the other kind is ignored.
+    """
+
+    def __init__(self, path: Optional[str] = None, ridge: float = 1.0, min_samples: int = 20, probes: bool = False):
+        self.path = path
+        self.ridge = ridge
+        self.min_samples = min_samples
+        self.probes = probes
+        size = len(FEATURE_NAMES)
+        self.xtx = np.zeros((size, size))
+        self.xty = np.zeros(size)
+        self.samples = 0
+        self.seen = set()
+        self.weights: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+
+    # --- Training ---
+    def observe(self, rows: np.ndarray, fitness: np.ndarray, genomes: Optional[Sequence[str]] = None):
+        """Adds (features, fitness) samples; rows whose genome was already observed are skipped."""
+        rows, fitness = np.atleast_2d(rows), np.asarray(fitness, dtype=np.float64)
+        if genomes is not None:
+            keep = [i for i, genome in enumerate(genomes) if genome not in self.seen]
+            rows, fitness = rows[keep], fitness[keep]
+        with self._lock:
+            self.xtx += rows.T @ rows
+            self.xty += rows.T @ fitness
+            self.samples += len(rows)
+            if genomes is not None:
+                self.seen.update(genomes)
+        self.fit()
+
+    def fit(self) -> Optional[np.ndarray]:
+        with self._lock:
+            if self.samples == 0:
+                return None
+            penalty = self.ridge * np.eye(len(FEATURE_NAMES))
+            penalty[0, 0] = 0.0  # the bias is not shrunk
+            self.weights = np.linalg.solve(self.xtx + penalty, self.xty)
+            return self.weights
+
+    @property
+    def trained(self) -> bool:
+        return self.weights is not None and self.samples >= self.min_samples
+
+    def predict(self, rows: np.ndarray) -> np.ndarray:
+        """Predicted fitness of every row at once."""
+        if self.weights is None:
+            raise ValueError("Surrogate model has no training data yet")
+        return np.atleast_2d(rows) @ self.weights
+
+    # --- Population helpers ---
+    def agent_features(self, population_dir: str, agent_ids: Sequence[str], manifest=None,
+                       agent_factory: Optional[Callable] = None) -> np.ndarray:
+        """
+        Feature rows for agents on disk. Parent fitness comes from the manifest when given; with
+        agent_factory(agent_folder=...) each agent also answers the probe states in one call.
+        """
+        rows = []
+        for agent_id in agent_ids:
+            agent_folder = os.path.join(population_dir, agent_id)
+            parent_fitness = None
+            entry = manifest.get(agent_id) if manifest is not None else None
+            if entry is not None:
+                parents = [manifest.get(p) for p in entry["parents"]]
+                scores = [p["fitness"] for p in parents if p is not None and p["fitness"] is not None]
+                parent_fitness = sum(scores) / len(scores) if scores else None
+            probes = probe_decisions(agent_factory(agent_folder=agent_folder).categorical_resp) if agent_factory else None
+            rows.append(features(MemoryStreamStore.for_agent(agent_folder).nodes(), parent_fitness, probes))
+        return np.stack(rows) if rows else np.zeros((0, len(FEATURE_NAMES)))
+
+    def train_from_fitness(self, population_dir: str, fitness: Dict[str, float], manifest=None,
+                           agent_factory: Optional[Callable] = None) -> int:
+        """
+        Learns from a generation's fitness (FitnessEvaluator.evaluate(...).fitness), one sample per
+        genome not seen before; returns samples added. Labels from one evaluation share its match
+        settings, so they are on one scale.
+        """
+        genomes = {agent_id: genome_hash(os.path.join(population_dir, agent_id)) for agent_id in fitness}
+        ids, new = [], set()
+        for agent_id, genome in genomes.items():
+            # Clones share a genome; each genome is one sample
+            if genome not in self.seen and genome not in new:
+                new.add(genome)
+                ids.append(agent_id)
+        if not ids:
+            return 0
+        rows = self.agent_features(population_dir, ids, manifest, agent_factory)
+        self.observe(rows, [fitness[agent_id] for agent_id in ids], [genomes[agent_id] for agent_id in ids])
+        self.save()
+        logging.info(f"Surrogate trained on {len(ids)} new genomes ({self.samples} total)")
+        return len(ids)
+
+    def screen(self, agent_ids: Sequence[str], rows: np.ndarray, fraction: float = 0.5,
+               min_keep: int = 1, size: Optional[int] = None) -> Tuple[List[str], Dict[str, float]]:
+        """
+        The top `fraction` (or, when given, the top `size`) of candidates by predicted fitness, and
+        every prediction. Until the model has min_samples of history, every candidate passes.
+        """
+        if not self.trained or not len(agent_ids):
+            return list(agent_ids), {}
+        predictions = self.predict(rows)
+        keep = size if size is not None else max(min_keep, int(np.ceil(fraction * len(agent_ids))))
+        order = np.argsort(-predictions, kind="stable")[:keep]
+        selected = [agent_ids[i] for i in sorted(order)]
+        logging.info(f"Surrogate kept {len(selected)} of {len(agent_ids)} candidates for full evaluation")
+        return selected, dict(zip(agent_ids, predictions.tolist()))
+
+    # --- Persistence ---
+    def load(self):
+        with open(self.path, "r") as f:
+            data = json.load(f)
+        if data.get("features") != FEATURE_NAMES:
+            logging.warning(f"Ignoring surrogate model {self.path}: it was trained on different features")
+            return
+        if data.get("probes", False) != self.probes:
+            logging.warning(f"Ignoring surrogate model {self.path}: it was trained {'without' if self.probes else 'with'} probes")
+            return
+        self.xtx = np.array(data["xtx"])
+        self.xty = np.array(data["xty"])
+        self.samples = data["samples"]
+        self.seen = set(data["seen"])
+        self.fit()
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {"features": FEATURE_NAMES, "probes": self.probes, "xtx": self.xtx.tolist(), "xty": self.xty.tolist(),
+                    "samples": self.samples, "seen": sorted(self.seen)}
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
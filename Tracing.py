@@ -0,0 +1,249 @@
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import threading
+import contextvars
+import statistics
+from typing import Dict, List, Optional
+
+# --- Configuration ---
+# Tracing is off unless configure() is called or TRACE_PATH is set. When off, span() returns a shared
+# no-op object, so instrumented code pays one global check per span.
+_enabled = False
+_path: Optional[str] = None
+_fd: Optional[int] = None
+_lock = threading.Lock()
+_ids = itertools.count(1)
+_current: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+# Counters summed onto a span (and reported per span name)
+# (estimated_tokens is the part of prompt + completion tokens that was estimated rather than reported by the API)
+COUNTERS = ("prompt_tokens", "completion_tokens", "estimated_tokens", "retries", "cache_hits", "cache_misses", "io_s")
+
+
+class _NoopSpan:
+    span_id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+    def add(self, key: str, value=1):
+        pass
+
+    def record_usage(self, response):
+        pass
+
+    def record_estimate(self, prompt_tokens, completion_tokens):
+        pass
+
+
+NOOP = _NoopSpan()
+
+
+class Span:
+    """One timed unit of work: generation > match > turn > llm. Written to the trace file when it ends."""
+
+    def __init__(self, name: str, parent_id: Optional[str] = None, **attrs):
+        self.name = name
+        self.span_id = f"{os.getpid()}-{next(_ids)}"
+        parent = _current.get()
+        self.parent_id = parent_id or (parent.span_id if parent is not None else None)
+        self.attrs = attrs
+        self.counters: Dict[str, float] = {}
+        self._token = None
+
+    def __enter__(self):
+        self.start = time.time()
+        self._perf_start = time.perf_counter()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        latency = time.perf_counter() - self._perf_start
+        _current.reset(self._token)
+        record = {"name": self.name, "span_id": self.span_id, "parent_id": self.parent_id,
+                  "start": self.start, "latency_s": latency, **self.attrs, **self.counters}
+        if exc_type is not None:
+            record["error"] = f"{exc_type.__name__}: {exc}"
+        _write(record)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, key: str, value=1):
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def record_usage(self, response):
+        """
+        Adds prompt/completion tokens from an OpenAI response (or instructor's attached raw response).
+        A response served from the LLM cache (the span counted a cache hit) cost no tokens and is skipped.
+        """
+        if self.counters.get("cache_hits"):
+            return
+        usage = getattr(response, "usage", None) or getattr(getattr(response, "_raw_response", None), "usage", None)
+        if usage is not None:
+            self.add("prompt_tokens", getattr(usage, "prompt_tokens", 0) or 0)
+            self.add("completion_tokens", getattr(usage, "completion_tokens", 0) or 0)
+
+    def record_estimate(self, prompt_tokens: int, completion_tokens: int):
+        """Adds token counts estimated from text length, for calls whose usage the API response did not give us."""
+        self.add("prompt_tokens", prompt_tokens)
+        self.add("completion_tokens", completion_tokens)
+        self.add("estimated_tokens", prompt_tokens + completion_tokens)
+        self.set(usage="estimated")
+
+
+def configure(path: str, enabled: bool = True):
+    """Starts writing spans as JSON lines to path. Exported as TRACE_PATH so worker processes follow."""
+    global _enabled, _path, _fd
+    with _lock:
+        if _fd is not None:
+            os.close(_fd)
+            _fd = None
+        _enabled = enabled
+        _path = path if enabled else None
+        if enabled:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            # O_APPEND keeps each single-write line intact when several processes share the file
+            _fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            os.environ["TRACE_PATH"] = path
+        else:
+            os.environ.pop("TRACE_PATH", None)
+
+
+def configure_from_env():
+    path = os.environ.get("TRACE_PATH")
+    if path and path != _path:
+        configure(path)
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def span(name: str, parent_id: Optional[str] = None, **attrs):
+    """Context manager timing a unit of work; a no-op when tracing is off."""
+    if not _enabled:
+        return NOOP
+    return Span(name, parent_id=parent_id, **attrs)
+
+
+def current():
+    """The innermost open span, or a no-op span."""
+    if not _enabled:
+        return NOOP
+    return _current.get() or NOOP
+
+
+def in_context(fn):
+    """Wraps fn to run in a copy of the caller's context, so spans opened in pool threads keep their parent."""
+    if not _enabled:
+        return fn
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+
+def _write(record: dict):
+    line = (json.dumps(record, default=str) + "\n").encode("utf-8")
+    with _lock:
+        if _fd is not None:
+            os.write(_fd, line)
+
+
+# ========== Reports ==========
+def load(path: str) -> List[dict]:
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _quantiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    if len(values) == 1:
+        return {"p50": values[0], "p95": values[0]}
+    cuts = statistics.quantiles(values, n=100)
+    return {"p50": cuts[49], "p95": cuts[94]}
+
+
+def summary(spans: List[dict]) -> dict:
+    """
+    Per span name latency quantiles and counter totals, plus p50/p95 turn latency and tokens per match
+    (with the share of those tokens that was estimated rather than reported by the API).
+    """
+    by_id = {s["span_id"]: s for s in spans}
+    report = {"spans": {}}
+    for name in sorted({s["name"] for s in spans}):
+        group = [s for s in spans if s["name"] == name]
+        latencies = [s["latency_s"] for s in group]
+        entry = {"count": len(group), "total_s": sum(latencies), **_quantiles(latencies)}
+        for counter in COUNTERS:
+            total = sum(s.get(counter, 0) for s in group)
+            if total:
+                entry[counter] = total
+        report["spans"][name] = entry
+
+    def match_of(s):
+        while s is not None and s["name"] != "match":
+            s = by_id.get(s.get("parent_id"))
+        return s
+
+    matches = [s for s in spans if s["name"] == "match"]
+    match_llm = [s for s in spans if s["name"] == "llm" and match_of(s) is not None]
+    tokens = sum(s.get("prompt_tokens", 0) + s.get("completion_tokens", 0) for s in match_llm)
+    estimated = sum(s.get("estimated_tokens", 0) for s in match_llm)
+    turns = report["spans"].get("turn", {})
+    report["turn_latency_s"] = {k: turns[k] for k in ("p50", "p95") if k in turns}
+    report["tokens_per_match"] = tokens / len(matches) if matches else None
+    report["estimated_token_share"] = estimated / tokens if tokens else None
+    return report
+
+
+def export_prometheus(spans: List[dict], path: str, prefix: str = "genagents"):
+    """Writes the summary in the Prometheus textfile-collector format."""
+    report = summary(spans)
+    lines = [f"# TYPE {prefix}_span_count counter", f"# TYPE {prefix}_span_seconds_total counter",
+             f"# TYPE {prefix}_span_latency_seconds gauge"]
+    for name, entry in report["spans"].items():
+        lines.append(f'{prefix}_span_count{{span="{name}"}} {entry["count"]}')
+        lines.append(f'{prefix}_span_seconds_total{{span="{name}"}} {entry["total_s"]}')
+        for quantile, label in (("p50", "0.5"), ("p95", "0.95")):
+            if quantile in entry:
+                lines.append(f'{prefix}_span_latency_seconds{{span="{name}",quantile="{label}"}} {entry[quantile]}')
+        for counter in COUNTERS:
+            if counter in entry:
+                lines.append(f'{prefix}_{counter}_total{{span="{name}"}} {entry[counter]}')
+    if report["tokens_per_match"] is not None:
+        lines.append(f"{prefix}_tokens_per_match {report['tokens_per_match']}")
+    if report["estimated_token_share"] is not None:
+        lines.append(f"{prefix}_estimated_token_share {report['estimated_token_share']}")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise a JSONL trace file.")
+    parser.add_argument("trace", help="path of the JSONL trace written with TRACE_PATH")
+    parser.add_argument("--prometheus", help="also write a Prometheus textfile to this path")
+    args = parser.parse_args()
+
+    spans = load(args.trace)
+    json.dump(summary(spans), sys.stdout, indent=2)
+    print()
+    if args.prometheus:
+        export_prometheus(spans, args.prometheus)
+
+
+if __name__ == "__main__":
+    main()
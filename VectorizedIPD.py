@@ -0,0 +1,253 @@
+import time
+import logging
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from PolicyTable import COOPERATE, DEFECT, PolicyTable, all_states
+from FitnessEvaluator import OpponentSpec, make_opponent, opponent_name
+
+# --- Encoding ---
+# Moves are 0 (C) and 1 (D). A turn is one digit 1 + 2 * own + opponent (0 pads histories shorter than k),
+# and the last k turns are a base-5 number with the newest turn as the lowest digit. The state also
+# carries whether each player has ever defected, so grudging strategies such as Grudger, whose memory
+# is unbounded, are represented exactly:
+#     state = window + 5**k * (2 * own_ever_defected + opponent_ever_defected)
+MOVES = {COOPERATE: 0, DEFECT: 1}
+
+# Axelrod's default game: (R, S, T, P)
+DEFAULT_GAME = (3, 0, 5, 1)
+
+
+def window_size(k: int) -> int:
+    return 5 ** k
+
+
+def n_states(k: int) -> int:
+    return 4 * window_size(k)
+
+
+def encode_window(own: str, opponent: str) -> int:
+    """Window index of recent moves given oldest first, e.g. ('CCD', 'DCC')."""
+    window = 0
+    for own_move, opponent_move in zip(own, opponent):
+        window = window * 5 + 1 + 2 * MOVES[own_move] + MOVES[opponent_move]
+    return window
+
+
+def payoff_matrix(game: Tuple[int, int, int, int] = DEFAULT_GAME) -> np.ndarray:
+    """payoffs[own, opponent] for moves 0 (C) and 1 (D)."""
+    reward, sucker, temptation, punishment = game
+    return np.array([[reward, sucker], [temptation, punishment]], dtype=np.float64)
+
+
+# ========== Tables ==========
+def policy_array(policy_table: PolicyTable) -> np.ndarray:
+    """A complete PolicyTable as a state -> move array (the agent's decisions ignore the defection flags)."""
+    k = policy_table.k
+    table = np.zeros(window_size(k), dtype=np.uint8)
+    missing = 0
+    for own, opponent in all_states(k):
+        action = policy_table.table.get(f"{own}:{opponent}")
+        if action is None:
+            missing += 1
+            continue
+        table[encode_window(own, opponent)] = MOVES[action]
+    if missing:
+        raise ValueError(f"Policy table for genome {policy_table.genome[:12]} is missing {missing} states; distill it first")
+    return np.tile(table, 4)
+
+
+def _prefixes(flag: bool, defected_in_window: bool) -> List[str]:
+    if not flag:
+        return ["", "CC", "C"]
+    if defected_in_window:
+        return ["", "CC", "D"]
+    return ["D", "DCC", "CCD"]
+
+
+def _probe_histories(own: str, opponent: str, own_flag: bool, opponent_flag: bool, k: int) -> List[Tuple[str, str]]:
+    """Full histories consistent with a state, with different prefixes before the last k turns."""
+    if len(own) < k:
+        # Early turns: the window is the whole history, so the flags must agree with it
+        if (DEFECT in own) != own_flag or (DEFECT in opponent) != opponent_flag:
+            return []
+        return [(own, opponent)]
+    if (DEFECT in own and not own_flag) or (DEFECT in opponent and not opponent_flag):
+        return []
+    own_prefixes = _prefixes(own_flag, DEFECT in own)
+    opponent_prefixes = _prefixes(opponent_flag, DEFECT in opponent)
+    histories = []
+    for own_prefix, opponent_prefix in zip(own_prefixes, opponent_prefixes):
+        length = max(len(own_prefix), len(opponent_prefix))
+        histories.append((own_prefix.rjust(length, "C") + own, opponent_prefix.rjust(length, "C") + opponent))
+    return histories
+
+
+def _respond(spec: OpponentSpec, own: str, opponent: str) -> int:
+    """The opponent's move after the given histories, replayed through axelrod's own update_history."""
+    import axelrod as axl
+    player, coplayer = make_opponent(spec), axl.Cooperator()
+    for own_move, opponent_move in zip(own, opponent):
+        player.update_history(axl.Action.from_char(own_move), axl.Action.from_char(opponent_move))
+        coplayer.update_history(axl.Action.from_char(opponent_move), axl.Action.from_char(own_move))
+    return MOVES[str(player.strategy(coplayer))]
+
+
+def opponent_array(spec: OpponentSpec, k: int) -> np.ndarray:
+    """
+    Probes a deterministic axelrod strategy for its move in every state. Each state is probed with
+    several histories that differ before the last k turns; if the answers differ, the strategy
+    depends on more than the state and a ValueError is raised.
+    """
+    if make_opponent(spec).classifier.get("stochastic"):
+        raise ValueError(f"{opponent_name(spec)} is stochastic and has no response table")
+    table = np.zeros(n_states(k), dtype=np.uint8)
+    for own, opponent in all_states(k):
+        window = encode_window(own, opponent)
+        for flags in range(4):
+            histories = _probe_histories(own, opponent, bool(flags & 2), bool(flags & 1), k)
+            moves = {_respond(spec, *history) for history in histories}
+            if len(moves) > 1:
+                raise ValueError(f"{opponent_name(spec)} depends on more than its last {k} moves and defection history")
+            if moves:
+                table[window + window_size(k) * flags] = moves.pop()
+    return table
+
+
+# ========== Engine ==========
+class VectorizedResult:
+    """Moves and per-turn scores of every (agent, opponent) pairing, as (pairs, turns, 2) arrays."""
+
+    def __init__(self, agent_index: np.ndarray, opponent_index: np.ndarray, moves: np.ndarray, scores: np.ndarray,
+                 elapsed: float):
+        self.agent_index = agent_index
+        self.opponent_index = opponent_index
+        self.moves = moves
+        self.scores = scores
+        self.elapsed = elapsed
+
+    def final_scores(self) -> np.ndarray:
+        """(pairs, 2) totals, like match.final_score() per pairing."""
+        return self.scores.sum(axis=1)
+
+    def match_scores(self, pair: int) -> List[Tuple[float, float]]:
+        """Per-turn scores of one pairing in the form match.scores() returns."""
+        return [tuple(turn) for turn in self.scores[pair].tolist()]
+
+    def fitness(self, n_agents: int) -> np.ndarray:
+        """Mean score per match of every agent over its opponents."""
+        totals = np.bincount(self.agent_index, weights=self.final_scores()[:, 0], minlength=n_agents)
+        counts = np.bincount(self.agent_index, minlength=n_agents)
+        return totals / np.maximum(counts, 1)
+
+
+class VectorizedIPD:
+    """
+    Plays N memory-k agents against M deterministic opponents, all N * M pairings at once, with one
+    NumPy step per turn. Per pairing this reproduces axl.Match(players, turns, noise=noise, seed=seed):
+    noise flips are drawn from the same RandomState stream (two draws per turn, agent first), so
+    scores agree with match.scores() move for move, with and without noise.
+    """
+
+    def __init__(self, k: int = 3, game: Tuple[int, int, int, int] = DEFAULT_GAME):
+        self.k = k
+        self.payoffs = payoff_matrix(game)
+        self._opponent_tables: Dict[str, np.ndarray] = {}
+
+    def opponent_tables(self, opponents: Sequence[OpponentSpec]) -> np.ndarray:
+        tables = []
+        for spec in opponents:
+            name = opponent_name(spec)
+            if name not in self._opponent_tables:
+                self._opponent_tables[name] = opponent_array(spec, self.k)
+            tables.append(self._opponent_tables[name])
+        return np.stack(tables)
+
+    def _noise_draws(self, pairs: int, turns: int, noise: float, seed: Union[None, int, Sequence[int]]) -> np.ndarray:
+        if seed is None or isinstance(seed, (int, np.integer)):
+            seeds = [seed] * pairs
+        else:
+            seeds = list(seed)
+        if seed is not None and len(set(seeds)) == 1:
+            # Same seed for every pairing: one stream, shared by all of them
+            return np.broadcast_to(np.random.RandomState(seeds[0]).rand(turns, 2)[:, None, :], (turns, pairs, 2))
+        return np.stack([np.random.RandomState(s).rand(turns, 2) for s in seeds], axis=1)
+
+    def play(self, agent_tables: np.ndarray, opponents: Union[np.ndarray, Sequence[OpponentSpec]], turns: int = 200,
+             noise: float = 0.0, seed: Union[None, int, Sequence[int]] = None) -> VectorizedResult:
+        """
+        agent_tables is (N, n_states(k)) as built by policy_array; opponents are specs or (M, n_states(k))
+        tables from opponent_array. seed is one seed for every pairing or one per pairing (agent-major).
+        """
+        start = time.perf_counter()
+        agent_tables = np.asarray(agent_tables, dtype=np.uint8)
+        opponent_tables = opponents if isinstance(opponents, np.ndarray) else self.opponent_tables(opponents)
+        n_agents, n_opponents = len(agent_tables), len(opponent_tables)
+        agent_index = np.repeat(np.arange(n_agents), n_opponents)
+        opponent_index = np.tile(np.arange(n_opponents), n_agents)
+        pairs = len(agent_index)
+
+        # Flattened lookups: table row offset + state
+        states = n_states(self.k)
+        agent_flat, opponent_flat = agent_tables.ravel(), opponent_tables.ravel()
+        agent_offset, opponent_offset = agent_index * states, opponent_index * states
+        draws = self._noise_draws(pairs, turns, noise, seed) if 0 < noise < 1 else None
+
+        size = window_size(self.k)
+        agent_window = np.zeros(pairs, dtype=np.int64)
+        opponent_window = np.zeros(pairs, dtype=np.int64)
+        agent_defected = np.zeros(pairs, dtype=np.int64)
+        opponent_defected = np.zeros(pairs, dtype=np.int64)
+        moves = np.empty((pairs, turns, 2), dtype=np.uint8)
+        for turn in range(turns):
+            a = agent_flat[agent_offset + agent_window + size * (2 * agent_defected + opponent_defected)].astype(np.int64)
+            b = opponent_flat[opponent_offset + opponent_window + size * (2 * opponent_defected + agent_defected)].astype(np.int64)
+            if draws is not None:
+                a ^= draws[turn, :, 0] < noise
+                b ^= draws[turn, :, 1] < noise
+            elif noise >= 1:
+                a, b = 1 - a, 1 - b
+            moves[:, turn, 0], moves[:, turn, 1] = a, b
+            agent_window = (agent_window * 5 + 1 + 2 * a + b) % size
+            opponent_window = (opponent_window * 5 + 1 + 2 * b + a) % size
+            agent_defected |= a
+            opponent_defected |= b
+
+        scores = np.stack([self.payoffs[moves[:, :, 0], moves[:, :, 1]],
+                           self.payoffs[moves[:, :, 1], moves[:, :, 0]]], axis=-1)
+        elapsed = time.perf_counter() - start
+        logging.info(f"Played {pairs} matches of {turns} turns in {elapsed:.3f}s")
+        return VectorizedResult(agent_index, opponent_index, moves, scores, elapsed)
+
+
+# ========== Cross-check ==========
+def table_player(policy_table: PolicyTable):
+    """An axelrod player that plays a complete PolicyTable, for comparison with the engine."""
+    import axelrod as axl
+
+    class TablePlayer(axl.Player):
+        name = "TablePlayer"
+        classifier = {"memory_depth": policy_table.k, "stochastic": False, "long_run_time": False,
+                      "inspects_source": False, "manipulates_source": False, "manipulates_state": False}
+
+        def strategy(self, opponent):
+            action = policy_table.lookup(self.history, opponent.history)
+            return axl.Action.C if action == COOPERATE else axl.Action.D
+
+    return TablePlayer()
+
+
+def cross_check(policy_tables: List[PolicyTable], opponents: Sequence[OpponentSpec], turns: int = 50,
+                noise: float = 0.0, seed: Optional[int] = None) -> dict:
+    """Plays every pairing with axl.Match and the engine; returns the pairings whose scores differ."""
+    import axelrod as axl
+    engine = VectorizedIPD(k=policy_tables[0].k)
+    result = engine.play(np.stack([policy_array(t) for t in policy_tables]), opponents, turns=turns, noise=noise, seed=seed)
+    mismatches = []
+    for pair, (a, m) in enumerate(zip(result.agent_index, result.opponent_index)):
+        match = axl.Match(players=[table_player(policy_tables[a]), make_opponent(opponents[m])],
+                          turns=turns, noise=noise, seed=seed)
+        match.play()
+        expected = [tuple(float(s) for s in turn) for turn in match.scores()]
+        if expected != result.match_scores(pair):
+            mismatches.append({"agent": policy_tables[a].genome, "opponent": opponent_name(opponents[m])})
+    return {"pairs": len(result.agent_index), "mismatches": mismatches}
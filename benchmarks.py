@@ -0,0 +1,521 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import logging
+import statistics
+import subprocess
+import tracemalloc
+from functools import partial
+from FakeLLM import FakeLLM, FakeGenerativeAgent, write_population
+from MemoryStreamStore import MemoryStreamStore
+from PopulationStore import PopulationStore
+import Tracing
+
+# --- Configuration ---
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Startup budgets checked by the startup benchmark; main() exits non-zero when one is exceeded
+IMPORT_BUDGET_S = 0.5
+# Time from FitnessEvaluator.evaluate() to its first completed match, with axelrod already imported (warm)
+# and in a fresh interpreter (cold, dominated by importing axelrod)
+WORKER_STARTUP_BUDGET_S = 2.0
+FIRST_MATCH_COLD_BUDGET_S = 30.0
+STARTUP_MODULES = ("GenAgentMutation", "InitialPopulation", "FitnessEvaluator", "MutationPhase", "cli")
+# Dependencies that must not be imported as a side effect of importing the modules above
+HEAVY_MODULES = ("axelrod", "openai", "instructor", "genagents", "numpy")
+
+
+def _trait_node(i: int) -> dict:
+    return {
+        "node_id": 0,
+        "node_type": "trait_adjustment",
+        "content": f"Retaliatory: increase punishment after defections (adjustment {i})",
+        "importance": 85,
+        "created": i,
+        "last_retrieved": i,
+        "pointer_id": None,
+    }
+
+
+def _legacy_append(json_path: str, node: dict):
+    """The old suggest_trait_change write path: read all of nodes.json, append one node, rewrite it."""
+    with open(json_path, 'r') as f:
+        nodes = json.load(f)
+    node = dict(node, node_id=max(n.get('node_id', 0) for n in nodes) + 1 if nodes else 0)
+    nodes.append(node)
+    with open(json_path, 'w') as f:
+        json.dump(nodes, f, indent=2)
+
+
+def bench_memory_stream(checkpoints=(1000, 10000, 100000), sample: int = 200, legacy_limit: int = 10000) -> dict:
+    """Mean append latency at growing stream sizes, for the append-only store and the legacy rewrite."""
+    results = {"store_append_us": {}, "legacy_append_us": {}}
+    workdir = tempfile.mkdtemp()
+    try:
+        store_dir = os.path.join(workdir, "store", "memory_stream")
+        store = MemoryStreamStore(store_dir)
+        for size in checkpoints:
+            if len(store) < size - sample:
+                store.append_many([_trait_node(i) for i in range(len(store), size - sample)])
+            start = time.perf_counter()
+            for i in range(sample):
+                store.append(_trait_node(i))
+            results["store_append_us"][size] = (time.perf_counter() - start) / sample * 1e6
+
+        legacy_dir = os.path.join(workdir, "legacy")
+        os.makedirs(legacy_dir)
+        legacy_path = os.path.join(legacy_dir, "nodes.json")
+        for size in checkpoints:
+            if size > legacy_limit:
+                break
+            with open(legacy_path, 'w') as f:
+                json.dump([dict(_trait_node(i), node_id=i) for i in range(size - sample)], f, indent=2)
+            legacy_sample = max(1, sample // 10)
+            start = time.perf_counter()
+            for i in range(legacy_sample):
+                _legacy_append(legacy_path, _trait_node(i))
+            results["legacy_append_us"][size] = (time.perf_counter() - start) / legacy_sample * 1e6
+
+        start = time.perf_counter()
+        store.compact()
+        results["compact_s"] = time.perf_counter() - start
+        results["nodes"] = len(store)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def _percentiles(samples: list) -> dict:
+    cuts = statistics.quantiles(samples, n=100) if len(samples) > 1 else samples * 99
+    return {"p50_ms": cuts[49] * 1e3, "p95_ms": cuts[94] * 1e3, "mean_ms": statistics.mean(samples) * 1e3}
+
+
+def _measure(fn):
+    """(result, seconds, peak traced bytes) of fn()."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def bench_population_store(agents: int = 300) -> dict:
+    """
+    Load time and memory of a population as pydantic AgentMemory lists versus the columnar store.
+    Building the store from nodes.json (columnar_from_json) parses the same JSON and is not reliably faster
+    than pydantic; the load-time win is only for reloading saved columns (columnar_reload_mmap).
+    """
+    results = {"agents": agents}
+    workdir = tempfile.mkdtemp()
+    try:
+        population_dir = os.path.join(workdir, "population")
+        write_population(population_dir, agents)
+
+        def load_pydantic():
+            from InitialPopulation import AgentMemory
+            memories = []
+            for agent_id in sorted(os.listdir(population_dir)):
+                with open(os.path.join(population_dir, agent_id, "memory_stream", "nodes.json")) as f:
+                    memories.append(AgentMemory(nodes=json.load(f)))
+            return memories
+
+        try:
+            _, seconds, peak = _measure(load_pydantic)
+            results["pydantic"] = {"load_s": seconds, "peak_bytes": peak}
+        except ImportError as e:
+            results["pydantic"] = {"skipped": str(e)}
+
+        store, seconds, peak = _measure(lambda: PopulationStore.from_population_dir(population_dir))
+        results["columnar_from_json"] = {"load_s": seconds, "peak_bytes": peak}
+
+        columns_dir = os.path.join(workdir, "columns")
+        store.save(columns_dir)
+        mapped, seconds, peak = _measure(lambda: PopulationStore.load(columns_dir))
+        results["columnar_reload_mmap"] = {"load_s": seconds, "peak_bytes": peak}
+        results["note"] = ("columnar_from_json is a one-off conversion that still parses every nodes.json; "
+                           "only columnar_reload_mmap (loading the saved columns) reliably beats pydantic on load time")
+        def original(agent_id):
+            with open(os.path.join(population_dir, agent_id, "memory_stream", "nodes.json")) as f:
+                return json.load(f)
+        results["lossless"] = all(mapped.agent_nodes(a) == original(a) for a in store.agent_ids[:10])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def bench_population_generation(size: int = 16, latency: float = 0.05, latency_per_token: float = 2e-5,
+                                error_rate: float = 0.0, concurrency_levels=(1, 2, 4, 8, 16)) -> dict:
+    """
+    Wall time of create_population against a FakeLLM per concurrency level, plus the chunked mode.
+    Set error_rate to inject 429s (retries then add jittered backoff to the timings).
+    """
+    from InitialPopulation import InitialPopulation
+    results = {"size": size, "latency_s": latency, "error_rate": error_rate, "wall_s": {}, "speedup": {}}
+    for concurrency in list(concurrency_levels) + ["chunked"]:
+        workdir = tempfile.mkdtemp()
+        try:
+            client = FakeLLM(latency=latency, latency_per_token=latency_per_token, error_rate=error_rate)
+            generator = InitialPopulation(output_dir=workdir, client=client)
+            start = time.perf_counter()
+            if concurrency == "chunked":
+                saved = generator.create_population(size, concurrency=max(concurrency_levels), chunk_size=15)
+            else:
+                saved = generator.create_population(size, concurrency=concurrency)
+            results["wall_s"][concurrency] = time.perf_counter() - start
+            results.setdefault("saved", {})[concurrency] = len(saved)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    baseline = results["wall_s"][concurrency_levels[0]]
+    results["speedup"] = {c: baseline / wall for c, wall in results["wall_s"].items()}
+    return results
+
+
+def bench_decision_latency(turns: int = 50, latency: float = 0.002) -> dict:
+    """Per-turn GenAgentPlayer.strategy latency against TitForTat with a FakeGenerativeAgent."""
+    import axelrod as axl
+    from GenAgentMutation import GenAgentPlayer
+    workdir = tempfile.mkdtemp()
+    try:
+        agent_folder = os.path.join(workdir, write_population(workdir, 1, questions=20)[0])
+        player = GenAgentPlayer(genagent=FakeGenerativeAgent(agent_folder, latency=latency), agent_folder=agent_folder)
+        samples = []
+        strategy = player.strategy
+
+        def timed_strategy(opponent):
+            start = time.perf_counter()
+            action = strategy(opponent)
+            samples.append(time.perf_counter() - start)
+            return action
+
+        player.strategy = timed_strategy
+        axl.Match(players=[player, axl.TitForTat()], turns=turns).play()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return dict(turns=turns, **_percentiles(samples))
+
+
+def bench_memory_compaction(agents: int = 4, generations: int = 3, turns: int = 200, processes: int = 2,
+                            per_node_latency: float = 2e-5, compact_every: int = 20) -> dict:
+    """
+    Per-turn decision latency and match-end stream size of FitnessEvaluator generations, with the
+    per-turn observations kept (compact_every=None) and folded every compact_every turns. Agents
+    are reset to their on-disk stream every match, so only a match's own observations pile up.
+    """
+    from FitnessEvaluator import FitnessEvaluator
+    results = {"agents": agents, "generations": generations, "turns": turns, "compact_every": compact_every}
+    workdir = tempfile.mkdtemp()
+    try:
+        population_dir = os.path.join(workdir, "population")
+        write_population(population_dir, agents, questions=113)
+        for mode, every in (("raw", None), ("compacted", compact_every)):
+            trace_path = os.path.join(workdir, f"{mode}.jsonl")
+            Tracing.configure(trace_path)
+            try:
+                evaluator = FitnessEvaluator(population_dir, turns=turns, processes=processes, compact_every=every,
+                                             agent_factory=partial(FakeGenerativeAgent, per_node_latency=per_node_latency))
+                wall = [evaluator.evaluate(generation=g).wall_time for g in range(generations)]
+            finally:
+                Tracing.configure("", enabled=False)
+            spans = Tracing.load(trace_path)
+            turn_latencies = [span["latency_s"] for span in spans if span["name"] == "turn"]
+            results[mode] = {
+                "wall_s": wall,
+                "turn": _percentiles(turn_latencies),
+                "max_match_end_nodes": max(span["nodes"] for span in spans if span["name"] == "match"),
+            }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def bench_mutation(agents: int = 50, latency: float = 0.02) -> dict:
+    """Time for one generation-level MutationPhase over a population, with a FakeLLM."""
+    from MutationPhase import MutationPhase
+    workdir = tempfile.mkdtemp()
+    try:
+        agent_ids = write_population(workdir, agents, questions=20)
+        phase = MutationPhase(workdir, client=FakeLLM(latency=latency), concurrency=16, seed=0)
+        start = time.perf_counter()
+        applied = phase.run(agent_ids)
+        wall = time.perf_counter() - start
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {"agents": agents, "mutated": len(applied), "wall_s": wall, "per_agent_ms": wall / max(1, len(applied)) * 1e3}
+
+
+def bench_generation_throughput(agents: int = 8, turns: int = 20, processes: int = 4, latency: float = 0.001) -> dict:
+    """
+    Matches/sec of full FitnessEvaluator generations with fake agents in the process pool: the first
+    generation of a process (which imports axelrod once) and the next one.
+    """
+    from FitnessEvaluator import FitnessEvaluator
+    workdir = tempfile.mkdtemp()
+    try:
+        write_population(workdir, agents, questions=20)
+        evaluator = FitnessEvaluator(workdir, turns=turns, processes=processes,
+                                     agent_factory=partial(FakeGenerativeAgent, latency=latency))
+        first, second = evaluator.evaluate(generation=0), evaluator.evaluate(generation=1)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {"agents": agents, "matches": len(second.matches),
+            "first_wall_s": first.wall_time, "first_matches_per_second": first.matches_per_second,
+            "wall_s": second.wall_time, "matches_per_second": second.matches_per_second}
+
+
+def bench_agent_pool(agents: int = 40, opponents: int = 6, workers: int = 4, capacity: int = 4) -> dict:
+    """
+    Agent loads per worker when a generation's matches are dealt round-robin to workers one by one
+    versus in per-agent groups, each worker holding a bounded AgentPool.
+    """
+    from AgentPool import AgentPool
+    results = {"agents": agents, "matches": agents * opponents, "workers": workers, "capacity": capacity}
+    workdir = tempfile.mkdtemp()
+    try:
+        agent_ids = write_population(workdir, agents, questions=113)
+        tasks = [agent_id for agent_id in agent_ids for _ in range(opponents)]
+        schedules = {
+            "per_match": [tasks[w::workers] for w in range(workers)],
+            "grouped": [[a for a in agent_ids[w::workers] for _ in range(opponents)] for w in range(workers)],
+        }
+        for name, per_worker in schedules.items():
+            pools = [AgentPool(workdir, capacity=capacity, agent_factory=FakeGenerativeAgent) for _ in per_worker]
+
+            def run():
+                for pool, worker_tasks in zip(pools, per_worker):
+                    for agent_id in worker_tasks:
+                        pool.get(agent_id)
+
+            _, seconds, peak = _measure(run)
+            results[name] = {"loads": sum(p.misses for p in pools), "hits": sum(p.hits for p in pools),
+                             "load_s": seconds, "peak_bytes": peak}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def bench_vectorized_ipd(agents: int = 500, turns: int = 200, k: int = 3, noise: float = 0.05, sample: int = 30) -> dict:
+    """
+    Round-robin of random memory-k policy tables against the default opponents: the NumPy engine
+    for every pairing versus axl.Match for a sample of pairings (extrapolated), plus a cross-check.
+    """
+    import random
+    import numpy as np
+    import axelrod as axl
+    from FitnessEvaluator import DEFAULT_OPPONENTS, make_opponent
+    from PolicyTable import PolicyTable, all_states
+    from VectorizedIPD import VectorizedIPD, cross_check, policy_array, table_player
+
+    rng = random.Random(0)
+    tables = []
+    for a in range(agents):
+        table = PolicyTable(f"agent-{a}", k=k)
+        table.table = {f"{own}:{opponent}": rng.choice("CD") for own, opponent in all_states(k)}
+        tables.append(table)
+    engine = VectorizedIPD(k=k)
+    start = time.perf_counter()
+    opponent_tables = engine.opponent_tables(DEFAULT_OPPONENTS)
+    probe_s = time.perf_counter() - start
+    agent_tables = np.stack([policy_array(t) for t in tables])
+    result = engine.play(agent_tables, opponent_tables, turns=turns, noise=noise, seed=0)
+
+    start = time.perf_counter()
+    for i in range(sample):
+        spec = DEFAULT_OPPONENTS[i % len(DEFAULT_OPPONENTS)]
+        axl.Match(players=[table_player(tables[i]), make_opponent(spec)], turns=turns, noise=noise, seed=0).play()
+    axelrod_per_match = (time.perf_counter() - start) / sample
+    matches = len(result.agent_index)
+    return {
+        "matches": matches, "turns": turns, "k": k, "noise": noise,
+        "opponent_probe_s": probe_s,
+        "vectorized_s": result.elapsed,
+        "axelrod_s_estimated": axelrod_per_match * matches,
+        "speedup": axelrod_per_match * matches / result.elapsed,
+        "cross_check_mismatches": len(cross_check(tables[:5], DEFAULT_OPPONENTS, turns=turns, noise=noise, seed=0)["mismatches"]),
+    }
+
+
+def bench_surrogate(train_agents: int = 200, candidates: int = 100, fraction: float = 0.3, k: int = 3,
+                    turns: int = 100) -> dict:
+    """
+    Selection quality of surrogate pre-screening on fake agents whose decisions depend on their trait
+    nodes. True fitness comes from distilling each agent's memory-k policy and a VectorizedIPD
+    round-robin. Compares the true fitness of the surrogate's top fraction of candidates with the
+    true top fraction, for the features `cli.py evolve` uses by default (trait adjustments) and with
+    --surrogate-probes. A fake agent's probe answers are entries of its distilled table, so the
+    probe figures are an upper bound on what probing a real agent buys.
+    """
+    import random
+    import numpy as np
+    from FakeLLM import TRAITS
+    from FitnessEvaluator import DEFAULT_OPPONENTS
+    from GenAgentMutation import GenAgentPlayer
+    from SurrogateFitness import SurrogateFitness
+    from VectorizedIPD import VectorizedIPD, policy_array
+
+    rng = random.Random(0)
+    results = {"candidates": candidates, "k": k,
+               "llm_calls_full": candidates * len(DEFAULT_OPPONENTS) * turns}
+    workdir = tempfile.mkdtemp()
+    try:
+        agent_ids = write_population(workdir, train_agents + candidates, questions=5)
+        for agent_id in agent_ids:
+            store = MemoryStreamStore.for_agent(os.path.join(workdir, agent_id))
+            store.append_many([dict(_trait_node(0), content=rng.choice(TRAITS)) for _ in range(rng.randint(0, 4))])
+            store.compact()
+        factory = partial(FakeGenerativeAgent, cooperation_bias=0.6)
+        folders = [os.path.join(workdir, a) for a in agent_ids]
+        tables = np.stack([policy_array(GenAgentPlayer(genagent=factory(agent_folder=f), agent_folder=f).distill_policy(k))
+                           for f in folders])
+        true_fitness = VectorizedIPD(k=k).play(tables, DEFAULT_OPPONENTS, turns=turns).fitness(len(agent_ids)) / turns
+        train, pool = agent_ids[:train_agents], agent_ids[train_agents:]
+        pool_fitness = dict(zip(pool, true_fitness[train_agents:]))
+        actual = np.array([pool_fitness[a] for a in pool])
+        results["pool_mean_fitness"] = float(actual.mean())
+
+        for name, agent_factory in (("traits", None), ("probes", factory)):
+            surrogate = SurrogateFitness(min_samples=10, probes=agent_factory is not None)
+            surrogate.observe(surrogate.agent_features(workdir, train, agent_factory=agent_factory),
+                              true_fitness[:train_agents])
+            rows = surrogate.agent_features(workdir, pool, agent_factory=agent_factory)
+            selected, predictions = surrogate.screen(pool, rows, fraction=fraction)
+            best = sorted(pool_fitness.values(), reverse=True)[:len(selected)]
+            predicted = np.array([predictions[a] for a in pool])
+            results[name] = {
+                "kept": len(selected),
+                "llm_calls_screened": (candidates if agent_factory else 0) + len(selected) * len(DEFAULT_OPPONENTS) * turns,
+                "prediction_correlation": float(np.corrcoef(predicted, actual)[0, 1]),
+                "selected_mean_fitness": float(np.mean([pool_fitness[a] for a in selected])),
+                "best_mean_fitness": float(np.mean(best)),
+            }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def bench_tracing_overhead(spans: int = 100000) -> dict:
+    """Cost per span with tracing off (the no-op path) and on (written to a temporary JSONL file)."""
+    def run():
+        start = time.perf_counter()
+        for i in range(spans):
+            with Tracing.span("turn", turn=i):
+                Tracing.current().add("io_s", 0.0)
+        return (time.perf_counter() - start) / spans * 1e6
+
+    results = {"off_us": run()}
+    workdir = tempfile.mkdtemp()
+    try:
+        Tracing.configure(os.path.join(workdir, "trace.jsonl"))
+        results["on_us"] = run()
+    finally:
+        Tracing.configure("", enabled=False)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def _import_time(module: str) -> dict:
+    code = (f"import sys, time; start = time.perf_counter(); import {module}; elapsed = time.perf_counter() - start; "
+            f"print(elapsed, ' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True).stdout.split()
+    return {"import_s": float(output[0]), "heavy_imports": output[1:]}
+
+
+_FIRST_MATCH = """
+import sys, time
+if sys.argv[2] == "warm":
+    import axelrod
+start = time.perf_counter()
+from FakeLLM import FakeGenerativeAgent
+from FitnessEvaluator import FitnessEvaluator
+FitnessEvaluator(sys.argv[1], opponents=["TitForTat"], turns=1, processes=1, agent_factory=FakeGenerativeAgent).evaluate()
+print(time.perf_counter() - start)
+"""
+
+
+def _first_match_time(population_dir: str, mode: str) -> float:
+    output = subprocess.run([sys.executable, "-c", _FIRST_MATCH, population_dir, mode],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True)
+    return float(output.stdout.split()[-1])
+
+
+def bench_startup(repeats: int = 3) -> dict:
+    """
+    Cold import time of each entry module in a fresh interpreter (best of `repeats`), which heavy
+    dependencies it pulled in, the cold import time of axelrod, and the time from
+    FitnessEvaluator.evaluate() to its first completed match in a fresh interpreter, with axelrod
+    already imported (warm) and not (cold).
+    """
+    results = {"budget": {"import_s": IMPORT_BUDGET_S, "first_match_warm_s": WORKER_STARTUP_BUDGET_S,
+                          "first_match_cold_s": FIRST_MATCH_COLD_BUDGET_S},
+               "imports": {}}
+    for module in STARTUP_MODULES:
+        runs = [_import_time(module) for _ in range(repeats)]
+        results["imports"][module] = min(runs, key=lambda run: run["import_s"])
+    results["axelrod_import_s"] = _import_time("axelrod")["import_s"]
+
+    workdir = tempfile.mkdtemp()
+    try:
+        write_population(workdir, 1, questions=5)
+        results["first_match_warm_s"] = min(_first_match_time(workdir, "warm") for _ in range(repeats))
+        results["first_match_cold_s"] = _first_match_time(workdir, "cold")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results["within_budget"] = (
+        all(run["import_s"] <= IMPORT_BUDGET_S and not run["heavy_imports"] for run in results["imports"].values())
+        and results["first_match_warm_s"] <= WORKER_STARTUP_BUDGET_S
+        and results["first_match_cold_s"] <= FIRST_MATCH_COLD_BUDGET_S
+    )
+    return results
+
+
+BENCHMARKS = {
+    "population_generation": bench_population_generation,
+    "decision_latency": bench_decision_latency,
+    "mutation": bench_mutation,
+    "memory_stream": bench_memory_stream,
+    "memory_compaction": bench_memory_compaction,
+    "population_store": bench_population_store,
+    "generation_throughput": bench_generation_throughput,
+    "agent_pool": bench_agent_pool,
+    "vectorized_ipd": bench_vectorized_ipd,
+    "surrogate": bench_surrogate,
+    "tracing_overhead": bench_tracing_overhead,
+    "startup": bench_startup,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run performance benchmarks and save the results as JSON.")
+    parser.add_argument("names", nargs="*", default=list(BENCHMARKS), help=f"benchmarks to run: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--output", help="path of the JSON results file (default: print only)")
+    args = parser.parse_args()
+
+    results = {"timestamp": time.strftime("%Y%m%d-%H%M%S"), "python": sys.version.split()[0], "benchmarks": {}}
+    for name in args.names:
+        print(f"Running {name}...")
+        try:
+            results["benchmarks"][name] = BENCHMARKS[name]()
+        except ImportError as e:
+            # e.g. axelrod or genagents missing from this environment
+            results["benchmarks"][name] = {"skipped": str(e)}
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    over_budget = [name for name, result in results["benchmarks"].items() if result.get("within_budget") is False]
+    if over_budget:
+        print(f"Over budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
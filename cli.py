@@ -0,0 +1,215 @@
+import os
+import sys
+import json
+import logging
+import argparse
+from typing import List, Optional
+import Tracing
+
+# Heavy modules (axelrod, openai, instructor, numpy, genagents) are imported by the subcommands that need them,
+# so `python cli.py --help` and worker processes start fast.
+
+DEFAULT_POPULATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'genagents', 'agent_bank',
+                                      'populations', 'fifty_agents')
+
+
+# ========== Shared setup ==========
+def _configure(args):
+    logging.basicConfig(level=getattr(logging, args.log_level), format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.llm_backend:
+        os.environ["LLM_BACKEND"] = args.llm_backend
+    if args.genagents_path:
+        os.environ["GENAGENTS_PATH"] = args.genagents_path
+    if args.llm_cache:
+        os.environ["LLM_CACHE_PATH"] = args.llm_cache
+    if args.trace:
+        Tracing.configure(args.trace)
+    else:
+        Tracing.configure_from_env()
+
+
+def _agent_factory(args):
+    if args.fake_agents:
+        from FakeLLM import FakeGenerativeAgent
+        return FakeGenerativeAgent
+    return None
+
+
+def _fitness_cache(args):
+    if not args.fitness_cache:
+        return None
+    from FitnessCache import FitnessCache
+    return FitnessCache(args.fitness_cache)
+
+
+def _evaluator(args, manifest):
+    from FitnessEvaluator import FitnessEvaluator
+    return FitnessEvaluator(
+        args.population_dir, opponents=args.opponents, turns=args.turns, repetitions=args.repetitions,
+        noise=args.noise, seed=args.seed, processes=args.processes, cache=_fitness_cache(args),
+        agent_factory=_agent_factory(args), manifest=manifest, pool_size=args.pool_size,
+        compact_every=args.compact_every or None, policy_k=args.policy_table,
+    )
+
+
+# ========== Commands ==========
+def generate(args):
+    """Creates (or resumes creating) a population of `size` agents."""
+    from InitialPopulation import InitialPopulation
+    generator = InitialPopulation(output_dir=args.population_dir)
+    saved = generator.create_population(
+        size=args.size, concurrency=args.concurrency, requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=args.tokens_per_minute, chunk_size=args.chunk_size, resume=not args.no_resume,
+    )
+    logging.info(f"Saved {len(saved)} new agents; {len(generator.manifest)} agents in {args.population_dir}")
+
+
+def evaluate(args):
+    """
+    Plays one generation's matches and records fitness in the manifest. Without --agents it plays
+    the current population: evolve's alive agents, else every agent that has not been retired.
+    """
+    from PopulationManifest import PopulationManifest
+    manifest = PopulationManifest(args.population_dir)
+    manifest.rebuild()
+    agent_ids = args.agents or manifest.get_checkpoint("alive") or None
+    result = _evaluator(args, manifest).evaluate(agent_ids, generation=args.generation)
+    ranking = sorted(result.fitness.items(), key=lambda item: item[1], reverse=True)
+    json.dump({"generation": result.generation, "matches_per_second": result.matches_per_second,
+               "fitness": dict(ranking)}, sys.stdout, indent=2)
+    print()
+
+
+def evolve(args):
+    """
+    Runs the GA loop: evaluate, keep the fittest, mutate offspring of the survivors, pre-screen the
+    offspring with the surrogate model and carry the survivors and the screened offspring forward.
+    The population keeps its starting size: once the surrogate is trained, about 1/--surrogate-fraction
+    offspring are spawned per free slot and the best predicted fill them; slots left empty (failed or
+    unselected mutations) go to the next-ranked agents of the generation.
+    The surrogate sees trait adjustments and parent fitness; with --surrogate-probes every agent it
+    scores also answers the probe states (one extra LLM call per agent).
+    Progress is checkpointed in the manifest after every generation, so a rerun resumes.
+    """
+    import math
+    from PopulationManifest import PopulationManifest
+    from MutationPhase import MutationPhase
+    from SurrogateFitness import SurrogateFitness
+
+    manifest = PopulationManifest(args.population_dir)
+    manifest.rebuild()
+    evaluator = _evaluator(args, manifest)
+    phase = MutationPhase(args.population_dir, mutation_rate=args.mutation_rate, concurrency=args.concurrency,
+                          requests_per_minute=args.requests_per_minute, seed=args.seed, manifest=manifest)
+    surrogate = SurrogateFitness(args.surrogate_model, probes=args.surrogate_probes) if args.surrogate_model else None
+    probe_factory = None
+    if args.surrogate_probes:
+        from AgentPool import generative_agent_class
+        probe_factory = _agent_factory(args) or generative_agent_class()
+
+    start = manifest.get_checkpoint("evolve_generation", 0)
+    alive: List[str] = manifest.get_checkpoint("alive") or manifest.agent_ids()
+    size = manifest.get_checkpoint("evolve_size") or len(alive)
+    manifest.checkpoint("evolve_size", size)
+    if start:
+        logging.info(f"Resuming evolution at generation {start} with {len(alive)} agents")
+    for generation in range(start, args.generations):
+        fitness = evaluator.evaluate(alive, generation=generation).fitness
+        if surrogate is not None:
+            surrogate.train_from_fitness(args.population_dir, fitness, manifest, probe_factory)
+
+        ranked = sorted(alive, key=lambda agent_id: fitness.get(agent_id, float("-inf")), reverse=True)
+        survivors = ranked[:max(1, int(size * args.survivors))]
+        needed = max(0, size - len(survivors))
+        screening = surrogate is not None and surrogate.trained
+        spawn = math.ceil(needed / args.surrogate_fraction) if screening else needed
+        # Fitter survivors parent the extra offspring first
+        parents = [survivors[i % len(survivors)] for i in range(spawn)]
+        phase.run(parents, fitness, spawn_offspring=True, generation=generation)
+        # Read offspring back from the manifest so those created before an interruption are included
+        offspring = [entry["agent_id"] for entry in manifest.filter()
+                     if entry.get("mutated_generation") == generation and entry["parents"]]
+
+        candidates = ranked + offspring
+        if screening and offspring:
+            rows = surrogate.agent_features(args.population_dir, offspring, manifest, probe_factory)
+            offspring, _ = surrogate.screen(offspring, rows, size=min(needed, len(offspring)))
+        offspring = offspring[:needed]
+        refill = [agent_id for agent_id in ranked[len(survivors):] if agent_id not in offspring]
+        refill = refill[:needed - len(offspring)]
+        alive = survivors + offspring + refill
+        manifest.checkpoint("alive", alive)
+        # Culled agents and screened-out offspring stay on disk but leave the population
+        manifest.retire([agent_id for agent_id in candidates if agent_id not in alive], generation)
+        manifest.checkpoint("evolve_generation", generation + 1)
+        best = ranked[0]
+        logging.info(f"Generation {generation}: best {best} ({fitness.get(best, 0):.2f}), "
+                     f"{len(survivors)} survivors, {len(offspring)} of {spawn} offspring, {len(refill)} carried over")
+
+
+# ========== Parser ==========
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Evolve genagents personalities for the Iterated Prisoner's Dilemma.")
+    parser.add_argument("--population-dir", default=os.environ.get("POPULATION_DIR", DEFAULT_POPULATION_DIR),
+                        help="population directory (default: $POPULATION_DIR or ../genagents/.../fifty_agents)")
+    parser.add_argument("--genagents-path", help="genagents checkout to import from when it is not installed")
+    parser.add_argument("--llm-backend", choices=["openai", "fake"], help="LLM client (default: $LLM_BACKEND or openai)")
+    parser.add_argument("--llm-cache", help="sqlite file caching LLM calls (see LLMCache)")
+    parser.add_argument("--trace", help="write JSONL spans to this file (see Tracing)")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="create or resume a population")
+    gen.add_argument("--size", type=int, default=50, help="target number of agents")
+    gen.add_argument("--concurrency", type=int, default=8)
+    gen.add_argument("--requests-per-minute", type=int, default=60)
+    gen.add_argument("--tokens-per-minute", type=int)
+    gen.add_argument("--chunk-size", type=int, help="generate each interview in streamed chunks of this many questions")
+    gen.add_argument("--no-resume", action="store_true", help="add `size` new agents instead of topping up to `size`")
+    gen.set_defaults(func=generate)
+
+    def match_options(sub):
+        sub.add_argument("--opponents", nargs="+", help="axelrod strategy names (default: FitnessEvaluator.DEFAULT_OPPONENTS)")
+        sub.add_argument("--turns", type=int, default=200)
+        sub.add_argument("--repetitions", type=int, default=1)
+        sub.add_argument("--noise", type=float, default=0.0)
+        sub.add_argument("--seed", type=int, default=0)
+        sub.add_argument("--processes", type=int, help="worker processes (default: CPU count)")
+        sub.add_argument("--pool-size", type=int, default=8, help="agents kept loaded per worker")
+        sub.add_argument("--compact-every", type=int, default=20,
+                         help="fold a match's per-turn observations into a summary every n turns (0 keeps them all)")
+        sub.add_argument("--policy-table", type=int, metavar="K",
+                         help="distill each genome's decisions on the last K moves once and play matches from the table")
+        sub.add_argument("--fitness-cache", help="sqlite file of match results keyed by genome (see FitnessCache)")
+        sub.add_argument("--fake-agents", action="store_true", help="play FakeGenerativeAgents instead of genagents")
+
+    ev = commands.add_parser("evaluate", help="play one generation and record fitness")
+    match_options(ev)
+    ev.add_argument("--generation", type=int, default=0)
+    ev.add_argument("--agents", nargs="+", help="agent ids (default: the alive agents of the last evolve generation, "
+                                                "else every agent in the manifest that has not been retired)")
+    ev.set_defaults(func=evaluate)
+
+    evo = commands.add_parser("evolve", help="run (or resume) the genetic algorithm")
+    match_options(evo)
+    evo.add_argument("--generations", type=int, default=10)
+    evo.add_argument("--survivors", type=float, default=0.5, help="fraction of each generation kept as parents")
+    evo.add_argument("--mutation-rate", type=float, default=1.0)
+    evo.add_argument("--concurrency", type=int, default=8, help="concurrent trait adjustment requests")
+    evo.add_argument("--requests-per-minute", type=int)
+    evo.add_argument("--surrogate-model", help="JSON file of the surrogate fitness model; enables pre-screening")
+    evo.add_argument("--surrogate-fraction", type=float, default=0.5, help="fraction of offspring sent to evaluation; the rest are screened out")
+    evo.add_argument("--surrogate-probes", action="store_true",
+                     help="also feed the surrogate each agent's answers to the probe states (one LLM call per agent)")
+    evo.set_defaults(func=evolve)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    args = build_parser().parse_args(argv)
+    _configure(args)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
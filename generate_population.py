@@ -5,6 +5,7 @@ from pydantic import BaseModel, Field
 from typing import List, Optional
 import logging
 from InitialPopulation import InitialPopulation
+import Tracing
 
 # --- Configuration ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -17,12 +18,14 @@ OUTPUT_DIR = os.path.join(BASE_DIR, '..', 'genagents', 'agent_bank', 'population
 def main():
     """Main function to generate the population of agents."""
     logging.info("Starting agent population generation...")
+    # Set TRACE_PATH to record spans for every LLM call
+    Tracing.configure_from_env()
     
     # Instantiate the population generator
     population_generator = InitialPopulation(output_dir=OUTPUT_DIR)
     
-    # Generate a population of 1 for testing
-    population_generator.create_population(size=50)
+    # Generate the population, several agents at a time within the API rate limits
+    population_generator.create_population(size=50, concurrency=8, requests_per_minute=60)
             
     logging.info("Agent population generation complete.")
 
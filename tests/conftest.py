@@ -0,0 +1,19 @@
+import os
+import sys
+import pytest
+
+# The modules live at the repository root rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FakeLLM import write_population  # noqa: E402
+
+
+@pytest.fixture
+def population(tmp_path):
+    """Writes a synthetic population (see FakeLLM.write_population) and returns its directory."""
+    population_dir = str(tmp_path / "population")
+
+    def make(agents: int = 3, questions: int = 4, **kwargs) -> str:
+        write_population(population_dir, agents, questions=questions, **kwargs)
+        return population_dir
+    return make
@@ -0,0 +1,38 @@
+import os
+from AgentPool import AgentPool
+from FakeLLM import FakeGenerativeAgent
+from MemoryStreamStore import MemoryStreamStore
+
+
+def _contents(genagent):
+    return [(node.node_id, node.content, node.last_retrieved) for node in genagent.memory_stream.seq_nodes]
+
+
+def test_every_get_hands_out_the_on_disk_state(population):
+    pool = AgentPool(population(), capacity=2, agent_factory=FakeGenerativeAgent)
+    genagent = pool.get("agent-0000").genagent
+    loaded = _contents(genagent)
+    genagent.remember("Opponent defected in the last round", time_step=1)
+    genagent.memory_stream.seq_nodes[0].last_retrieved = 7
+
+    assert pool.get("agent-0000").genagent is genagent  # a hit: not reloaded
+    assert _contents(genagent) == loaded
+    assert "Opponent defected in the last round" not in genagent.memory_stream.embeddings
+
+
+def test_disk_changes_are_picked_up_and_eviction_flushes_the_log(population):
+    population_dir = population()
+    pool = AgentPool(population_dir, capacity=1, agent_factory=FakeGenerativeAgent)
+    pool.get("agent-0000")
+    store = MemoryStreamStore.for_agent(os.path.join(population_dir, "agent-0000"))
+    store.append({"node_type": "trait_adjustment", "content": "Nice: increase cooperation", "importance": 85,
+                  "created": 1, "last_retrieved": 1, "pointer_id": None})
+    store.compact()
+    assert len(pool.get("agent-0000").genagent.memory_stream.seq_nodes) == 5
+
+    pool.get("agent-0000").store.append({"node_type": "trait_adjustment", "content": "Clear: stay consistent",
+                                      "importance": 85, "created": 2, "last_retrieved": 2, "pointer_id": None})
+    pool.get("agent-0001")  # evicts agent-0
+    assert pool.evictions == 1
+    assert MemoryStreamStore.for_agent(os.path.join(population_dir, "agent-0000")).pending == 0
+    assert len(pool.get("agent-0000").genagent.memory_stream.seq_nodes) == 6
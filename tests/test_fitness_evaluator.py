@@ -0,0 +1,56 @@
+import os
+import pytest
+
+pytest.importorskip("axelrod")
+
+import LLMBackend
+from functools import partial
+from FakeLLM import FakeLLM, FakeGenerativeAgent
+from FitnessCache import FitnessCache
+from FitnessEvaluator import FitnessEvaluator, _init_worker, _worker_config, play_match
+from GenAgentMutation import GenAgentPlayer
+from LLMCache import CachedClient, LLMCache
+
+
+def test_worker_does_not_inherit_the_parents_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(LLMBackend, "_client", FakeLLM())
+    _init_worker(str(tmp_path))
+    assert LLMBackend._client is None
+
+
+def test_cached_matches_are_keyed_on_player_settings(tmp_path, population):
+    population_dir = population(1)
+    cache = FitnessCache(str(tmp_path / "fitness.sqlite"))
+
+    def evaluate(**kwargs):
+        return FitnessEvaluator(population_dir, opponents=["TitForTat", "Defector"], turns=6, processes=1,
+                                cache=cache, **kwargs).evaluate()
+
+    assert evaluate(agent_factory=FakeGenerativeAgent, compact_every=None).cached_matches == 0
+    assert evaluate(agent_factory=FakeGenerativeAgent, compact_every=None).cached_matches == 2
+    assert evaluate(agent_factory=FakeGenerativeAgent, compact_every=5).cached_matches == 0
+    assert evaluate(agent_factory=partial(FakeGenerativeAgent, cooperation_bias=0.2), compact_every=5).cached_matches == 0
+    assert evaluate(agent_factory=FakeGenerativeAgent, compact_every=5, policy_k=2).cached_matches == 0
+
+
+def test_policy_distillation_goes_through_the_llm_cache(tmp_path, population, monkeypatch):
+    folder = os.path.join(population(1), "agent-0000")
+    client = CachedClient(FakeLLM(), LLMCache(str(tmp_path / "llm.sqlite")))
+    monkeypatch.setattr(LLMBackend, "_client", client)
+
+    def distill():
+        return GenAgentPlayer(genagent=FakeGenerativeAgent(agent_folder=folder), agent_folder=folder).distill_policy(2)
+
+    first = distill()
+    assert first.is_complete() and client.hits == 0
+    assert distill().table == first.table
+    assert client.hits == client.misses > 0
+
+
+def test_worker_distills_each_genome_once(population, monkeypatch):
+    monkeypatch.setattr(LLMBackend, "_client", FakeLLM())
+    _init_worker(population(1), agent_factory=FakeGenerativeAgent, policy_k=2)
+    for opponent in ("TitForTat", "Defector"):
+        play_match("agent-0000", opponent, turns=6)
+    [table] = _worker_config["policy_tables"].values()
+    assert table.is_complete() and table.misses == 0 and table.hits == 12
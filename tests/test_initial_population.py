@@ -0,0 +1,29 @@
+import os
+import json
+import pytest
+import RateLimiter
+from FakeLLM import FakeLLM
+from InitialPopulation import InitialPopulation
+
+
+def _node_counts(population_dir, agent_ids):
+    counts = []
+    for agent_id in agent_ids:
+        with open(os.path.join(population_dir, agent_id, "memory_stream", "nodes.json")) as f:
+            counts.append(len(json.load(f)))
+    return counts
+
+
+@pytest.mark.parametrize("chunk_size", [None, 40])
+def test_rate_limited_generation_retries_until_every_agent_is_saved(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(RateLimiter, "backoff_delay", lambda *args, **kwargs: 0.0)
+    expected = InitialPopulation(str(tmp_path / "clean"), client=FakeLLM()).create_population(
+        1, chunk_size=chunk_size)
+
+    client = FakeLLM(error_rate=0.3)
+    population_dir = str(tmp_path / "throttled")
+    saved = InitialPopulation(population_dir, client=client).create_population(
+        4, concurrency=4, max_retries=10, chunk_size=chunk_size)
+    assert len(saved) == 4
+    assert client.errors > 0
+    assert set(_node_counts(population_dir, saved)) == set(_node_counts(str(tmp_path / "clean"), expected))
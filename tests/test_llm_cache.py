@@ -0,0 +1,68 @@
+import os
+import json
+import pytest
+from FakeLLM import FakeLLM
+from InitialPopulation import InitialPopulation
+from LLMCache import CachedClient, CacheMiss, LLMCache, READ_THROUGH, REPLAY_ONLY, WRITE_ONLY
+
+
+def _interviews(population_dir):
+    """Interview answers of each generated agent, by persona index."""
+    population = InitialPopulation(population_dir, client=FakeLLM())
+    interviews = {}
+    for entry in population.manifest.filter(generation=0):
+        with open(os.path.join(population_dir, entry["agent_id"], "memory_stream", "nodes.json")) as f:
+            interviews[entry["persona_index"]] = [node["content"] for node in json.load(f)]
+    return interviews
+
+
+@pytest.mark.parametrize("chunk_size", [None, 40])
+def test_generation_replays_without_live_calls(tmp_path, chunk_size):
+    cache = LLMCache(str(tmp_path / "llm.sqlite"))
+    recorded = str(tmp_path / "recorded")
+    InitialPopulation(recorded, client=CachedClient(FakeLLM(), cache, READ_THROUGH)).create_population(
+        2, concurrency=2, chunk_size=chunk_size)
+
+    live = FakeLLM(seed=1)
+    replayed = str(tmp_path / "replayed")
+    saved = InitialPopulation(replayed, client=CachedClient(live, cache, REPLAY_ONLY)).create_population(
+        2, concurrency=2, chunk_size=chunk_size)
+    assert len(saved) == 2
+    assert live.calls == 0
+    interviews = _interviews(replayed)
+    assert interviews == _interviews(recorded)
+    assert interviews[0] != interviews[1]
+
+
+def _ask(client, question):
+    response = client.chat.completions.create(model="fake", messages=[{"role": "user", "content": question}])
+    return response.choices[0].message.content
+
+
+def test_cache_modes(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite"))
+    live = FakeLLM()
+    recorded = _ask(CachedClient(live, cache, READ_THROUGH), "Hello")
+    assert _ask(CachedClient(live, cache, READ_THROUGH), "Hello") == recorded
+    assert live.calls == 1
+
+    # write_only always calls the API and overwrites the entry
+    refreshed = _ask(CachedClient(live, cache, WRITE_ONLY), "Hello")
+    assert live.calls == 2 and refreshed != recorded
+
+    replay = CachedClient(live, cache, REPLAY_ONLY)
+    assert _ask(replay, "Hello") == refreshed
+    with pytest.raises(CacheMiss):
+        _ask(replay, "Goodbye")
+    assert live.calls == 2 and (replay.hits, replay.misses) == (1, 1)
+
+
+def test_eviction_drops_least_recently_used_entries(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite"), max_bytes=250)
+    for key in ("a", "b", "c"):
+        cache.put(key, "x" * 100)
+        cache.get("a")
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert len(cache) == 2
@@ -0,0 +1,29 @@
+from FakeLLM import FakeGenerativeAgent
+from MemoryCompaction import MemoryCompactor, MatchSummary, OBSERVATION, CURRENT
+
+
+def _play(genagent, compactor, own, opponent):
+    for turn in range(1, len(opponent) + 1):
+        last = "cooperated" if opponent[turn - 1] == "C" else "defected"
+        genagent.remember(f"Opponent {last} in the last round", time_step=turn)
+        compactor.compact_turns(genagent, "Grudger", own[:turn], opponent[:turn])
+
+
+def test_compact_turns_bounds_a_match_and_summarises_all_of_it():
+    genagent = FakeGenerativeAgent()
+    genagent.remember("Interviewer: Where did you grow up?\n\nBy the river.")
+    own, opponent = "CD" * 25, "C" + "CD" * 24 + "D"
+    _play(genagent, MemoryCompactor(every=10), own, opponent)
+
+    contents = [node.content for node in genagent.memory_stream.seq_nodes]
+    assert len(contents) <= 1 + 1 + 10
+    assert contents[0].startswith("Interviewer:")
+    current = [c for c in contents if CURRENT.match(c)]
+    assert current == [MatchSummary.from_history("Grudger", opponent[:50], own[:50], in_progress=True).content()]
+    assert [node.node_id for node in genagent.memory_stream.seq_nodes] == list(range(len(contents)))
+    assert set(genagent.memory_stream.embeddings) == set(contents)
+
+    MemoryCompactor().compact_match(genagent, "Grudger", own, opponent)
+    contents = [node.content for node in genagent.memory_stream.seq_nodes]
+    assert not any(OBSERVATION.match(c) or CURRENT.match(c) for c in contents)
+    assert MatchSummary.parse(contents[-1]).rounds == 50
@@ -0,0 +1,85 @@
+import os
+import json
+import multiprocessing
+from MemoryStreamStore import MemoryStreamStore
+
+
+def _node(i: int) -> dict:
+    return {"node_id": 0, "node_type": "trait_adjustment", "content": f"Nice: adjustment {i}",
+            "importance": 85, "created": i, "last_retrieved": i, "pointer_id": None}
+
+
+def _agent(tmp_path, base_nodes: int = 3) -> str:
+    agent_folder = str(tmp_path / "agent")
+    os.makedirs(os.path.join(agent_folder, "memory_stream"))
+    with open(os.path.join(agent_folder, "memory_stream", "nodes.json"), "w") as f:
+        json.dump([dict(_node(i), node_id=i, node_type="observation") for i in range(base_nodes)], f)
+    return agent_folder
+
+
+def test_torn_record_is_truncated_on_open(tmp_path):
+    agent_folder = _agent(tmp_path)
+    store = MemoryStreamStore.for_agent(agent_folder)
+    assert store.append_many([_node(1), _node(2)]) == [3, 4]
+    with open(store.log_path, "ab") as f:
+        f.write(b'{"node_id": 5, "content": "half a rec')
+
+    reopened = MemoryStreamStore.for_agent(agent_folder)
+    assert [node["node_id"] for node in reopened.nodes()] == [0, 1, 2, 3, 4]
+    assert reopened.append(_node(3)) == 5
+    with open(store.log_path, "rb") as f:
+        assert all(json.loads(line)["node_id"] in (3, 4, 5) for line in f)
+
+
+def test_readers_leave_an_in_flight_append_alone(tmp_path):
+    agent_folder = _agent(tmp_path)
+    writer = MemoryStreamStore.for_agent(agent_folder)
+    record = json.dumps(dict(_node(1), node_id=3)).encode("utf-8") + b"\n"
+    with writer._locked_log() as f:
+        f.write(record[:20])
+        f.flush()
+        reader = MemoryStreamStore.for_agent(agent_folder)
+        assert [node["node_id"] for node in reader.nodes()] == [0, 1, 2]
+        f.write(record[20:])
+    assert reader.append(_node(2)) == 4
+    assert [node["created"] for node in MemoryStreamStore.for_agent(agent_folder).nodes()[3:]] == [1, 2]
+
+
+def test_log_records_already_compacted_are_skipped(tmp_path):
+    agent_folder = _agent(tmp_path)
+    store = MemoryStreamStore.for_agent(agent_folder)
+    store.append_many([_node(1), _node(2)])
+    with open(store.log_path, "rb") as f:
+        log = f.read()
+    store.compact()
+    # A crash between compaction's rename of nodes.json and its truncation of the log
+    with open(store.log_path, "wb") as f:
+        f.write(log)
+
+    reopened = MemoryStreamStore.for_agent(agent_folder)
+    assert [node["node_id"] for node in reopened.nodes()] == [0, 1, 2, 3, 4]
+    assert reopened.pending == 0
+    assert reopened.append(_node(3)) == 5
+
+
+def _append_from_process(agent_folder: str, worker: int, count: int):
+    store = MemoryStreamStore.for_agent(agent_folder, compact_every=7)
+    for i in range(count):
+        store.append(_node(worker * 1000 + i))
+
+
+def test_concurrent_appends_from_processes(tmp_path):
+    agent_folder = _agent(tmp_path)
+    workers, count = 4, 25
+    processes = [multiprocessing.Process(target=_append_from_process, args=(agent_folder, w, count))
+                 for w in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    nodes = MemoryStreamStore.for_agent(agent_folder).nodes()
+    assert [node["node_id"] for node in nodes] == list(range(3 + workers * count))
+    appended = sorted(node["created"] for node in nodes[3:])
+    assert appended == sorted(w * 1000 + i for w in range(workers) for i in range(count))
@@ -0,0 +1,40 @@
+import os
+
+import LLMBackend
+from FakeLLM import FakeLLM
+from MutationPhase import MutationPhase, clone_agent
+from PopulationManifest import PopulationManifest
+
+
+def _offspring(manifest, generation):
+    return sorted(entry["parents"][0] for entry in manifest.filter() if entry.get("mutated_generation") == generation)
+
+
+def test_repeated_parents_spawn_one_child_each_and_resume(population):
+    population_dir = population(2)
+    manifest = PopulationManifest(population_dir)
+    manifest.rebuild()
+    parents = ["agent-0000", "agent-0001", "agent-0000", "agent-0000"]
+    MutationPhase(population_dir, client=FakeLLM(), seed=0, manifest=manifest).run(parents[:2], spawn_offspring=True, generation=0)
+    assert _offspring(manifest, 0) == ["agent-0000", "agent-0001"]
+
+    # A rerun of the generation with the full parent list only spawns the missing children
+    MutationPhase(population_dir, client=FakeLLM(), seed=0, manifest=manifest).run(parents, spawn_offspring=True, generation=0)
+    assert _offspring(manifest, 0) == ["agent-0000", "agent-0000", "agent-0000", "agent-0001"]
+
+
+def test_client_is_built_on_first_request(population, monkeypatch):
+    monkeypatch.setattr(LLMBackend, "_client", None)
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    phase = MutationPhase(population(2))
+    assert LLMBackend._client is None
+    assert phase.client is LLMBackend.get_client()
+
+
+def test_clone_leaves_a_compacted_parent_untouched(population):
+    population_dir = population(1)
+    nodes_path = os.path.join(population_dir, "agent-0000", "memory_stream", "nodes.json")
+    os.utime(nodes_path, ns=(0, 0))
+    child_id = clone_agent(population_dir, "agent-0000")
+    assert os.stat(nodes_path).st_mtime_ns == 0
+    assert os.path.exists(os.path.join(population_dir, child_id, "memory_stream", "nodes.json"))
@@ -0,0 +1,31 @@
+from MutationPhase import clone_agent
+from PopulationManifest import PopulationManifest
+
+
+def test_rebuild_skips_interrupted_and_unregistered_clones(population):
+    population_dir = population(2)
+    manifest = PopulationManifest(population_dir)
+    manifest.rebuild()
+    assert manifest.agent_ids() == ["agent-0000", "agent-0001"]
+
+    # A crash after cloning, before the clone was registered, with and without a reservation
+    manifest.reserve({"reserved-child": ["agent-0000"]})
+    clone_agent(population_dir, "agent-0000", "reserved-child")
+    clone_agent(population_dir, "agent-0001", "orphan-child")
+
+    reopened = PopulationManifest(population_dir)
+    reopened.rebuild()
+    assert reopened.agent_ids() == ["agent-0000", "agent-0001"]
+    assert len(reopened.filter(generation=0)) == 2
+
+    reopened.register("reserved-child", generation=1, parents=["agent-0000"])
+    assert "reserved-child" not in PopulationManifest(population_dir).data["pending"]
+
+
+def test_retired_agents_leave_the_population_but_stay_indexed(population):
+    manifest = PopulationManifest(population(3))
+    manifest.rebuild()
+    manifest.retire(["agent-0001"], generation=4)
+    assert manifest.agent_ids() == ["agent-0000", "agent-0002"]
+    assert manifest.agent_ids(include_retired=True) == ["agent-0000", "agent-0001", "agent-0002"]
+    assert PopulationManifest(manifest.population_dir).get("agent-0001")["retired_generation"] == 4
@@ -0,0 +1,37 @@
+import pytest
+from PopulationStore import PopulationStore
+
+NODES = [
+    {"node_id": 0, "node_type": "observation", "content": "Interviewer: Where did you grow up?\n\nBy the river.",
+     "importance": 80, "created": 0, "last_retrieved": 0, "pointer_id": None},
+    {"node_id": 1, "node_type": "observation", "content": "Opponent defected in the last round",
+     "importance": 50, "created": 2, "last_retrieved": 2, "pointer_id": 0},
+    {"node_id": 2, "node_type": "reflection", "content": "I forgive one defection but not two.",
+     "importance": 70, "created": 3, "last_retrieved": 3, "pointer_id": [0, 1]},
+    {"node_id": 3, "node_type": "reflection", "content": "No evidence yet.",
+     "importance": 60, "created": 3, "last_retrieved": 3, "pointer_id": []},
+]
+
+
+def test_round_trip_is_lossless(tmp_path):
+    store = PopulationStore()
+    store.add_agent("a", NODES)
+    store.add_agent("b", NODES[:2])
+    assert store.agent_nodes("a") == NODES
+    store.save(str(tmp_path))
+    for mmap_content in (True, False):
+        loaded = PopulationStore.load(str(tmp_path), mmap_content=mmap_content)
+        assert loaded.agent_nodes("a") == NODES
+        assert loaded.agent_nodes("b") == NODES[:2]
+
+
+@pytest.mark.parametrize("field, value", [("importance", 7.5), ("pointer_id", "0"), ("created", None)])
+def test_invalid_node_is_rejected_without_partial_rows(field, value):
+    store = PopulationStore()
+    store.add_agent("a", NODES)
+    with pytest.raises(ValueError):
+        store.add_agent("b", NODES[:2] + [dict(NODES[2], **{field: value})])
+    assert store.agent_ids == ["a"]
+    assert len(store.node_id) == len(store.pointer_id) == len(NODES)
+    assert len(store.pointer_offsets) == len(store.content_offsets) == len(NODES) + 1
+    assert store.agent_nodes("a") == NODES
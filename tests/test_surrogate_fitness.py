@@ -0,0 +1,15 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from SurrogateFitness import SurrogateFitness
+
+
+def test_trains_from_a_generations_fitness_once_per_genome(tmp_path, population):
+    population_dir = population(3)
+    path = str(tmp_path / "surrogate.json")
+    surrogate = SurrogateFitness(path, min_samples=1)
+    fitness = {"agent-0000": 2.0, "agent-0001": 3.0, "agent-0002": 1.5}
+    assert surrogate.train_from_fitness(population_dir, fitness) == 3
+    assert surrogate.train_from_fitness(population_dir, fitness) == 0
+    assert SurrogateFitness(path).samples == 3
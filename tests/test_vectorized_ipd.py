@@ -0,0 +1,37 @@
+import random
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("axelrod")
+
+from FitnessEvaluator import DEFAULT_OPPONENTS
+from PolicyTable import PolicyTable, all_states
+from VectorizedIPD import cross_check, opponent_array
+
+# Memory-one strategies whose moves depend on their own history as well as the opponent's
+OPPONENTS = DEFAULT_OPPONENTS + ["WinStayLoseShift", "Alternator"]
+
+
+def _tables(k: int, agents: int = 4):
+    rng = random.Random(k)
+    tables = []
+    for a in range(agents):
+        table = PolicyTable(f"agent-{a}", k=k)
+        table.table = {f"{own}:{opponent}": rng.choice("CD") for own, opponent in all_states(k)}
+        tables.append(table)
+    return tables
+
+
+@pytest.mark.parametrize("noise", [0.0, 0.05])
+@pytest.mark.parametrize("k", [1, 2, 3])
+def test_engine_matches_axelrod(k, noise):
+    # TitFor2Tats looks two moves back, so it only fits in a memory-k state for k >= 2
+    opponents = [spec for spec in OPPONENTS if k > 1 or spec != "TitFor2Tats"]
+    result = cross_check(_tables(k), opponents, turns=40, noise=noise, seed=0)
+    assert result["pairs"] == 4 * len(opponents)
+    assert result["mismatches"] == []
+
+
+def test_opponents_longer_than_k_are_rejected():
+    with pytest.raises(ValueError):
+        opponent_array("TitFor2Tats", 1)